@@ -0,0 +1,42 @@
+"""Micro-benchmark of extract_urv_contents against the pre-rewrite implementation.
+
+Run from backend/:  python benchmarks/bench_urv_extractor.py [--repeat N]
+"""
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(BACKEND_DIR), str(BACKEND_DIR / "tests")]
+
+from bs4 import BeautifulSoup
+from src.extractors.urv_extractor import extract_urv_contents
+from src.utils.html_utils import HTML_PARSER
+from urv_legacy import legacy_extract_urv_contents
+from urv_tables import nested_page
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = {
+        "fixture": (BACKEND_DIR / "tests" / "fixtures" / "urv_fitxa.html").read_text(encoding="utf-8"),
+        "nested-50": nested_page(random.Random(9), 50),
+        "nested-150": nested_page(random.Random(9), 150),
+    }
+    print(f"parser: {HTML_PARSER}")
+    for name, html in pages.items():
+        soup = BeautifulSoup(html, HTML_PARSER)
+        assert extract_urv_contents(soup) == legacy_extract_urv_contents(soup), name
+        timings = {}
+        for label, fn in (("legacy", legacy_extract_urv_contents), ("current", extract_urv_contents)):
+            number = 20 if name == "fixture" else 1
+            timings[label] = min(timeit.repeat(lambda: fn(soup), number=number, repeat=args.repeat)) / number
+        print(f"{name:>11}: legacy {timings['legacy'] * 1000:8.2f} ms | current {timings['current'] * 1000:8.2f} ms"
+              f" | x{timings['legacy'] / timings['current']:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,30 @@
+import asyncio
+import json
 import logging
-from fastapi import FastAPI, HTTPException, Depends
+from datetime import datetime
+from typing import Dict, Optional
+from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import difflib
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from src.extractors.guide_extractor import extract_subjects_from_guide_generic
-from src.extractors.subject_extractor import extract_subject_from_url
-from src.llm.subject_llm import extract_subject_theme, extract_subjects_with_llm
-from src.comparators.theme_comparator import compare_themes
 from src.comparators.content_comparator import similarity_score
-from src.utils.subject_utils import convert_to_new_format
-from models.schemas import CompareRequest, CompareSubjectsRequest
-from src.database.database import Comparison, get_db
+from models.schemas import CompareRequest, CompareSubjectsRequest, CompareBatchRequest, IngestGuideRequest, SearchRequest
+from src.database.database import Comparison, SessionLocal, get_db
+from src.database.subject_store import find_subject_id
+from src.database.comparison_store import find_comparison, upsert_comparison, query_comparison_history, serialize_comparison
+from src.utils.page_cache import page_cache
+from src.extractors.subject_extractor import aprefetch_subject_pages
+from src.utils.embedding_utils import embedding_cache
+from src.utils.translation import translator
+from src.llm.client import llm_cache
+from src.llm.scheduler import llm_scheduler
+from src.pipeline.subject_artifacts import SubjectArtifacts
+from src.pipeline.compare_pipeline import build_combined_text, resolve_subject_details, run_batch_guide_comparison, run_guide_comparison, run_subject_search
+from src.pipeline.jobs import job_manager
+from src.pipeline.ingestion import ingest_guide
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,6 +42,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# El streaming NDJSON de /compare-stream no se comprime para no retener eventos en el buffer de gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000, exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/x-ndjson",))
+
+def save_comparison(db: Session, values: Dict) -> None:
+    upsert_comparison(db, values)
+    db.commit()
 
 @app.post("/compare-subjects")
 async def compare_subjects(request: CompareSubjectsRequest, db: Session = Depends(get_db)):
@@ -40,13 +59,9 @@ async def compare_subjects(request: CompareSubjectsRequest, db: Session = Depend
     logger.info(f"🔵 [MAIN] URL1: {request.url1}, Título1: {request.subject_title1}")
     logger.info(f"🔵 [MAIN] URL2: {request.url2}, Título2: {request.subject_title2}")
 
-    existing_comparison = db.query(Comparison).filter(
-        Comparison.url1 == request.url1,
-        Comparison.subject_title1 == request.subject_title1,
-        Comparison.url2 == request.url2,
-        Comparison.subject_title2 == request.subject_title2,
-        Comparison.comparison_type == "compare-subjects"
-    ).first()
+    existing_comparison = await run_in_threadpool(
+        find_comparison, db, "compare-subjects", request.url1, request.subject_title1, request.url2, request.subject_title2
+    )
 
     if existing_comparison:
         logger.info(f"🟢 [MAIN] Comparación ya existe en la base de datos, devolviendo resultado almacenado")
@@ -62,62 +77,22 @@ async def compare_subjects(request: CompareSubjectsRequest, db: Session = Depend
         }
 
     try:
-        logger.info("🔵 [MAIN] Fase 1: Extrayendo contenido de las asignaturas")
-        subject_text1 = extract_subject_from_url(request.url1, request.subject_title1)
-        subject_text2 = extract_subject_from_url(request.url2, request.subject_title2)
-        
-        logger.debug(f"🔵 [MAIN] Texto crudo asignatura 1 (primeros 500 chars):\n{subject_text1[:500]}")
-        logger.debug(f"🔵 [MAIN] Texto crudo asignatura 2 (primeros 500 chars):\n{subject_text2[:500]}")
-
-        logger.info("🔵 [MAIN] Fase 2: Extrayendo detalles estructurados")
-        subjects1 = extract_subjects_with_llm(subject_text1, subject_title=request.subject_title1)
-        subjects2 = extract_subjects_with_llm(subject_text2, subject_title=request.subject_title2)
-        
-        logger.debug(f"🔵 [MAIN] Respuesta LLM asignatura 1:\n{subjects1}")
-        logger.debug(f"🔵 [MAIN] Respuesta LLM asignatura 2:\n{subjects2}")
-
-        subjects1 = convert_to_new_format(subjects1)
-        subjects2 = convert_to_new_format(subjects2)
-        logger.debug(f"🔵 [MAIN] Asignatura 1 formateada:\n{subjects1}")
-        logger.debug(f"🔵 [MAIN] Asignatura 2 formateada:\n{subjects2}")
-
-        input_title1 = request.subject_title1
-        best_match1 = difflib.get_close_matches(input_title1.upper(), [s.upper() for s in subjects1.keys()], n=1, cutoff=0.3)
-        if not best_match1:
-            logger.error(f"🔴 [MAIN] No se encontró la asignatura '{request.subject_title1}'. Títulos extraídos: {list(subjects1.keys())}")
-            raise HTTPException(status_code=400, detail=f"Asignatura '{request.subject_title1}' no encontrada. Títulos disponibles: {list(subjects1.keys())}")
-        
-        input_title2 = request.subject_title2
-        best_match2 = difflib.get_close_matches(input_title2.upper(), [s.upper() for s in subjects2.keys()], n=1, cutoff=0.3)
-        if not best_match2:
-            logger.error(f"🔴 [MAIN] No se encontró la asignatura '{request.subject_title2}'. Títulos extraídos: {list(subjects2.keys())}")
-            raise HTTPException(status_code=400, detail=f"Asignatura '{request.subject_title2}' no encontrada. Títulos disponibles: {list(subjects2.keys())}")
-
-        match_upper1 = best_match1[0]
-        original_title1 = next((s for s in subjects1.keys() if s.upper() == match_upper1), match_upper1)
-        match_upper2 = best_match2[0]
-        original_title2 = next((s for s in subjects2.keys() if s.upper() == match_upper2), match_upper2)
-
-        subject_data1 = subjects1[original_title1]
-        subject_data2 = subjects2[original_title2]
+        logger.info("🔵 [MAIN] Fases 1-2: Extrayendo contenido y detalles estructurados de ambas asignaturas en paralelo")
+        # Las páginas de ambas asignaturas se descargan a la vez con la API asíncrona; la extracción las lee de la caché
+        await aprefetch_subject_pages([request.url1, request.url2])
+        artifacts = SubjectArtifacts()
+        (original_title1, subject_data1), (original_title2, subject_data2) = await asyncio.gather(
+            run_in_threadpool(resolve_subject_details, artifacts, request.url1, request.subject_title1, 0.3),
+            run_in_threadpool(resolve_subject_details, artifacts, request.url2, request.subject_title2, 0.3)
+        )
 
-        combined_text1 = f"""
-            Nombre: {original_title1}
-            Competencias: {subject_data1.get('competences', '')}
-            Objetivos: {subject_data1.get('objectives', '')}
-            Contenidos: {subject_data1.get('contents', '')}
-        """
-        combined_text2 = f"""
-            Nombre: {original_title2}
-            Competencias: {subject_data2.get('competences', '')}
-            Objetivos: {subject_data2.get('objectives', '')}
-            Contenidos: {subject_data2.get('contents', '')}
-        """
+        combined_text1 = build_combined_text(original_title1, subject_data1)
+        combined_text2 = build_combined_text(original_title2, subject_data2)
         logger.debug(f"🔵 [MAIN] Texto combinado asignatura 1:\n{combined_text1}")
         logger.debug(f"🔵 [MAIN] Texto combinado asignatura 2:\n{combined_text2}")
 
         logger.info("🔵 [MAIN] Fase 3: Calculando similitud de contenido")
-        analysis = similarity_score(combined_text1, combined_text2)
+        analysis = await run_in_threadpool(similarity_score, combined_text1, combined_text2)
         logger.info(f"🔵 [MAIN] Resultado análisis:\n{analysis}")
 
         result = {
@@ -131,7 +106,11 @@ async def compare_subjects(request: CompareSubjectsRequest, db: Session = Depend
             "explicacion": analysis.get('explanation', '')
         }
 
-        db_comparison = Comparison(
+        subject1_id, subject2_id = await run_in_threadpool(lambda: (
+            find_subject_id(db, request.url1, request.subject_title1),
+            find_subject_id(db, request.url2, request.subject_title2)
+        ))
+        db_comparison = dict(
             url1=request.url1,
             subject_title1=request.subject_title1,
             url2=request.url2,
@@ -142,11 +121,11 @@ async def compare_subjects(request: CompareSubjectsRequest, db: Session = Depend
             explanation=analysis.get('explanation', ''),
             comparison_type="compare-subjects",
             detalles_origen=subject_data1,
-            detalles_comparada=subject_data2
+            detalles_comparada=subject_data2,
+            subject1_id=subject1_id,
+            subject2_id=subject2_id
         )
-        db.add(db_comparison)
-        db.commit()
-        db.refresh(db_comparison)
+        await run_in_threadpool(save_comparison, db, db_comparison)
 
         logger.info("🟢 [MAIN] Comparación de asignaturas completada y guardada en la base de datos")
         return result
@@ -166,225 +145,25 @@ async def compare(request: CompareRequest, db: Session = Depends(get_db)):
     logger.info(f"🔵 [MAIN] Título asignatura: {request.subject_title}")
 
     try:
-        # Fase inicial: Extraer detalles de la asignatura principal (siempre, ya que es rápida y necesaria)
-        logger.info("🔵 [MAIN] Extrayendo asignatura principal")
-        subject_text = extract_subject_from_url(request.url1, request.subject_title)
-        main_theme = extract_subject_theme(subject_text)
-        logger.info(f"🔵 [MAIN] Temática principal identificada: {main_theme}")
-
-        subjects1 = extract_subjects_with_llm(subject_text, subject_title=request.subject_title)
-        subjects1 = convert_to_new_format(subjects1)
-
-        input_title = request.subject_title
-        best_match = difflib.get_close_matches(input_title.upper(), [s.upper() for s in subjects1.keys()], n=1, cutoff=0.4)
-        if not best_match:
-            logger.error(f"🔴 [MAIN] No se encontró la asignatura '{request.subject_title}'")
-            raise HTTPException(status_code=400, detail="Asignatura no encontrada")
-        
-        match_upper = best_match[0]
-        original_title = next((s for s in subjects1.keys() if s.upper() == match_upper), match_upper)
-        request.subject_title = original_title
-        subject_data = subjects1[request.subject_title]
-        combined_text1 = f"""
-            Nombre: {request.subject_title}
-            Competencias: {subject_data.get('competences', '')}
-            Objetivos: {subject_data.get('objectives', '')}
-            Contenidos: {subject_data.get('contents', '')}
-        """
-
-        # Nueva verificación inicial: Buscar comparaciones existentes para esta guía y asignatura origen
-        existing_comparisons = db.query(Comparison).filter(
-            Comparison.url1 == request.url1,
-            Comparison.subject_title1 == request.subject_title,
-            Comparison.guide_url == request.url2,
-            Comparison.comparison_type == "compare"
-        ).all()
-
-        if existing_comparisons:
-            logger.info(f"🟢 [MAIN] Comparaciones existentes encontradas para esta guía ({len(existing_comparisons)}), devolviendo resultados almacenados")
-            detailed_subjects = []
-            for comp in existing_comparisons:
-                detailed_subjects.append({
-                    "asignatura": comp.subject_title2,
-                    "similitud_tematica": comp.theme_similarity,
-                    "similitud_contenido": comp.similarity_score,
-                    "componentes": comp.components,
-                    "analisis": comp.analysis,
-                    "explicacion": comp.explanation,
-                    "detalles": comp.detalles_comparada or {},
-                    "url": comp.url2
-                })
-            detailed_subjects.sort(key=lambda x: x["similitud_contenido"], reverse=True)
-            
-            return {
-                "asignatura_origen": request.subject_title,
-                "tema_principal": main_theme,
-                "detalles_origen": subject_data,
-                "coincidencias": detailed_subjects[:5]
-            }
-
-        # Si no existen, proceder con el flujo completo
-        logger.info("🔵 [MAIN] No se encontraron comparaciones existentes, procediendo con extracción completa")
-
-        logger.info("🔵 [MAIN] Fase 1: Extrayendo asignaturas básicas de la guía docente")
-        guide_subjects = extract_subjects_from_guide_generic(request.url2, max_subjects=10)
-        logger.info(f"🔵 [MAIN] Asignaturas encontradas en guía: {len(guide_subjects)}")
-        
-        logger.info("🔵 [MAIN] Fase 2: Procesando asignatura principal")
-        guide_subjects_content = []
-        for subject in guide_subjects:
-            try:
-                subject_content = extract_subject_from_url(subject["url"], subject["name"])
-                if subject_content:
-                    guide_subjects_content.append({
-                        "name": subject["name"],
-                        "url": subject["url"],
-                        "content": subject_content
-                    })
-                    logger.info(f"✅ Contenido extraído para asignatura: {subject['name']}")
-                else:
-                    logger.warning(f"⚠️ No se encontró contenido para asignatura: {subject['name']}")
-            except Exception as e:
-                logger.error(f"❌ Error al procesar asignatura {subject['name']}: {e}")
-
-        logger.info(f"🔵 [MAIN] Asignaturas con contenido extraído: {len(guide_subjects_content)}")
-        subject_text = extract_subject_from_url(request.url1, request.subject_title)
-        main_theme = extract_subject_theme(subject_text)
-        logger.info(f"🔵 [MAIN] Temática principal identificada: {main_theme}")
-
-        logger.info("🔵 [MAIN] Fase 3: Comparando temáticas")
-        filtered_subjects = []
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_subject = {
-                executor.submit(extract_subject_theme, extract_subject_from_url(subject['url'], subject['name'])): subject 
-                for subject in guide_subjects
-            }
-            for future in as_completed(future_to_subject):
-                subject = future_to_subject[future]
-                try:
-                    subject_theme = future.result()
-                    theme_similarity = compare_themes(main_theme, subject_theme, request.subject_title, subject['name'])
-                    logger.info(f"🔵 [MAIN] Comparación temática: {subject['name']} - Similitud: {theme_similarity:.2f}")
-                    if theme_similarity >= 0.66:
-                        filtered_subjects.append({
-                            'name': subject['name'],
-                            'theme': subject_theme,
-                            'theme_similarity': theme_similarity,
-                            'url': subject['url']
-                        })
-                except Exception as e:
-                    logger.error(f"🔴 [MAIN] Error comparando tema: {str(e)}")
-
-        logger.info(f"🔵 [MAIN] Asignaturas relevantes encontradas: {len(filtered_subjects)}")
-
-        logger.info("🔵 [MAIN] Fase 4: Extrayendo detalles asignatura principal")
-        subjects1 = extract_subjects_with_llm(subject_text, subject_title=request.subject_title)
-        logger.debug(f"🔵 [MAIN] Respuesta LLM asignatura principal:\n{subjects1}")
-        subjects1 = convert_to_new_format(subjects1)
-        logger.debug(f"🔵 [MAIN] Asignatura principal formateada:\n{subjects1}")
-
-        input_title = request.subject_title
-        best_match = difflib.get_close_matches(input_title.upper(), [s.upper() for s in subjects1.keys()], n=1, cutoff=0.4)
-        if not best_match:
-            logger.error(f"🔴 [MAIN] No se encontró la asignatura '{request.subject_title}'")
-            raise HTTPException(status_code=400, detail="Asignatura no encontrada")
-        
-        match_upper = best_match[0]
-        original_title = next((s for s in subjects1.keys() if s.upper() == match_upper), match_upper)
-        request.subject_title = original_title
-        subject_data = subjects1[request.subject_title]
-        combined_text1 = f"""
-            Nombre: {request.subject_title}
-            Competencias: {subject_data.get('competences', '')}
-            Objetivos: {subject_data.get('objectives', '')}
-            Contenidos: {subject_data.get('contents', '')}
-        """
-        logger.debug(f"🔵 [MAIN] Texto combinado asignatura principal:\n{combined_text1}")
-
-        logger.info("🔵 [MAIN] Fase 5: Procesando asignaturas relevantes")
-        detailed_subjects = []
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_analysis = {
-                executor.submit(lambda s: extract_subjects_with_llm(extract_subject_from_url(s['url'], s['name']), subject_title=s['name']), subject): subject
-                for subject in filtered_subjects
-            }
-            for future in as_completed(future_to_analysis):
-                subject = future_to_analysis[future]
-                try:
-                    # Verificar si la comparación ya existe
-                    existing_comparison = db.query(Comparison).filter(
-                        Comparison.url1 == request.url1,
-                        Comparison.subject_title1 == request.subject_title,
-                        Comparison.url2 == subject['url'],
-                        Comparison.subject_title2 == subject['name'],
-                        Comparison.comparison_type == "compare"
-                    ).first()
-
-                    if existing_comparison:
-                        logger.info(f"🟢 [MAIN] Comparación ya existe para {subject['name']}, devolviendo resultado almacenado")
-                        detailed_subjects.append({
-                            "asignatura": existing_comparison.subject_title2,
-                            "similitud_tematica": subject['theme_similarity'],
-                            "similitud_contenido": existing_comparison.similarity_score,
-                            "componentes": existing_comparison.components,
-                            "analisis": existing_comparison.analysis,
-                            "explicacion": existing_comparison.explanation,
-                            "detalles": {},  # Puedes mejorar esto si tienes más detalles almacenados
-                            "url": subject['url']
-                        })
-                        continue
-
-                    subject_info = future.result()
-                    logger.debug(f"🔵 [MAIN] Respuesta LLM asignatura relevante:\n{subject_info}")
-                    if subject_info:
-                        subject_name, details = next(iter(subject_info.items()))
-                        combined_text2 = f"""
-                            Nombre: {subject_name}
-                            Competencias: {details.get('competences', '')}
-                            Objetivos: {details.get('objectives', '')}
-                            Contenidos: {details.get('contents', '')}
-                        """
-                        logger.debug(f"🔵 [MAIN] Texto combinado asignatura relevante:\n{combined_text2}")
-                        logger.info("🔵 [MAIN] Calculando similitud con embedding...")
-                        analysis = similarity_score(combined_text1, combined_text2)
-                        logger.info(f"🔵 [MAIN] Resultado análisis:\n{analysis}")
-                        detailed_subjects.append({
-                            "asignatura": subject_name,
-                            "similitud_tematica": subject['theme_similarity'],
-                            "similitud_contenido": analysis.get('score', 0) * 100,
-                            "componentes": analysis.get('components', {}),
-                            "analisis": analysis.get('llm_analysis', ''),
-                            "explicacion": analysis.get('explanation', ''),
-                            "detalles": details,
-                            "url": subject['url']
-                        })
-
-                        db_comparison = Comparison(
-                            url1=request.url1,
-                            subject_title1=request.subject_title,
-                            url2=subject['url'],
-                            subject_title2=subject_name,
-                            similarity_score=analysis.get('score', 0) * 100,
-                            components=analysis.get('components', {}),
-                            analysis=analysis.get('llm_analysis', ''),
-                            explanation=analysis.get('explanation', ''),
-                            comparison_type="compare"
-                        )
-                        db.add(db_comparison)
-                        db.commit()
-                        db.refresh(db_comparison)
+        return await run_in_threadpool(run_guide_comparison, request.url1, request.subject_title, request.url2, db)
+    except HTTPException as he:
+        logger.error(f"🔴 [MAIN] HTTPException: {he.detail}")
+        raise he
+    except Exception as e:
+        logger.error(f"🔴 [MAIN] Error inesperado: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
 
-                except Exception as e:
-                    logger.error(f"🔴 [MAIN] Error analizando asignatura: {str(e)}")
+@app.post("/compare-batch")
+async def compare_batch(request: CompareBatchRequest, db: Session = Depends(get_db)):
+    logger.info(f"🔵 [MAIN] Comparación por lotes: {len(request.subjects)} asignaturas contra guía {request.url2}")
+    if not request.subjects:
+        raise HTTPException(status_code=400, detail="La lista de asignaturas está vacía")
 
-        detailed_subjects.sort(key=lambda x: x["similitud_contenido"], reverse=True)
-        logger.info("🟢 [MAIN] Comparación completada y guardada en la base de datos")
-        return {
-            "asignatura_origen": request.subject_title,
-            "tema_principal": main_theme,
-            "detalles_origen": subject_data,
-            "coincidencias": detailed_subjects[:5]
-        }
+    try:
+        sources = [subject.model_dump() for subject in request.subjects]
+        # Las asignaturas origen se resuelven una tras otra: sus páginas se descargan antes, todas a la vez
+        await aprefetch_subject_pages([source["url1"] for source in sources])
+        return await run_in_threadpool(run_batch_guide_comparison, sources, request.url2, db)
     except HTTPException as he:
         logger.error(f"🔴 [MAIN] HTTPException: {he.detail}")
         raise he
@@ -392,32 +171,124 @@ async def compare(request: CompareRequest, db: Session = Depends(get_db)):
         logger.error(f"🔴 [MAIN] Error inesperado: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/compare-stream")
+async def compare_stream(request: CompareRequest):
+    logger.info(f"🔵 [MAIN] Iniciando comparación en streaming: {request.subject_title} ({request.url1}) vs guía {request.url2}")
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def listener(event: str, payload: dict) -> None:
+        if event in ("source", "match"):
+            loop.call_soon_threadsafe(events.put_nowait, {"event": event, **payload})
+
+    def run_pipeline() -> dict:
+        db = SessionLocal()
+        try:
+            return run_guide_comparison(request.url1, request.subject_title, request.url2, db, listener)
+        finally:
+            db.close()
+
+    async def event_stream():
+        pipeline = asyncio.ensure_future(run_in_threadpool(run_pipeline))
+        while True:
+            next_event = asyncio.ensure_future(events.get())
+            done, _ = await asyncio.wait({next_event, pipeline}, return_when=asyncio.FIRST_COMPLETED)
+            if next_event in done:
+                yield json.dumps(next_event.result(), ensure_ascii=False, default=str) + "\n"
+                continue
+            next_event.cancel()
+            break
+        while not events.empty():
+            yield json.dumps(events.get_nowait(), ensure_ascii=False, default=str) + "\n"
+        try:
+            result = pipeline.result()
+            yield json.dumps({"event": "summary", **result}, ensure_ascii=False, default=str) + "\n"
+            logger.info("🟢 [MAIN] Comparación en streaming completada")
+        except HTTPException as he:
+            logger.error(f"🔴 [MAIN] HTTPException: {he.detail}")
+            yield json.dumps({"event": "error", "status_code": he.status_code, "detail": he.detail}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"🔴 [MAIN] Error inesperado: {str(e)}", exc_info=True)
+            yield json.dumps({"event": "error", "status_code": 500, "detail": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@app.post("/compare-jobs", status_code=202)
+async def create_compare_job(request: CompareRequest):
+    logger.info(f"🔵 [MAIN] Nuevo trabajo de comparación: {request.subject_title} ({request.url1}) vs guía {request.url2}")
+    job = job_manager.submit(
+        "compare",
+        request.model_dump(),
+        lambda db, listener: run_guide_comparison(request.url1, request.subject_title, request.url2, db, listener),
+        priority="interactive"
+    )
+    return {"job_id": job["job_id"], "status": job["status"], "queue_position": job["queue_position"]}
+
+@app.post("/ingest-guide", status_code=202)
+async def create_ingest_job(request: IngestGuideRequest):
+    logger.info(f"🔵 [MAIN] Nuevo trabajo de ingesta de guía: {request.guide_url}")
+    job = job_manager.submit(
+        "ingest",
+        request.model_dump(),
+        lambda db, listener: ingest_guide(request.guide_url, restart=request.restart, listener=listener),
+        priority="background"
+    )
+    return {"job_id": job["job_id"], "status": job["status"], "queue_position": job["queue_position"]}
+
+@app.get("/compare-jobs/{job_id}")
+@app.get("/jobs/{job_id}")
+async def get_compare_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo '{job_id}' no encontrado")
+    return job
+
+@app.post("/search")
+async def search_subjects(request: SearchRequest):
+    logger.info(f"🔵 [MAIN] Búsqueda en índice para: {request.subject_title} ({request.url1})")
+    try:
+        return await run_in_threadpool(run_subject_search, request.url1, request.subject_title, request.top_k)
+    except HTTPException as he:
+        logger.error(f"🔴 [MAIN] HTTPException: {he.detail}")
+        raise he
+    except Exception as e:
+        logger.error(f"🔴 [MAIN] Error inesperado en búsqueda: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/comparison-history")
-async def get_comparison_history(db: Session = Depends(get_db)):
+def get_comparison_history(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[int] = None,
+    comparison_type: Optional[str] = None,
+    url: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    min_score: Optional[float] = None,
+    include_details: bool = False,
+    db: Session = Depends(get_db)
+):
     try:
-        comparisons = db.query(Comparison).all()
-        return [
-            {
-                "id": comp.id,
-                "created_at": comp.created_at.isoformat(),
-                "url1": comp.url1,
-                "subject_title1": comp.subject_title1,
-                "url2": comp.url2,
-                "subject_title2": comp.subject_title2,
-                "similarity_score": comp.similarity_score,
-                "components": comp.components,
-                "analysis": comp.analysis,
-                "explanation": comp.explanation,
-                "comparison_type": comp.comparison_type
-            }
-            for comp in comparisons
-        ]
+        comparisons, next_cursor = query_comparison_history(
+            db, limit=limit, cursor=cursor, comparison_type=comparison_type, url=url,
+            date_from=date_from, date_to=date_to, min_score=min_score, include_details=include_details
+        )
+        return {
+            "items": [serialize_comparison(comp, include_details) for comp in comparisons],
+            "next_cursor": next_cursor
+        }
     except Exception as e:
         logger.error(f"🔴 [MAIN] Error retrieving comparison history: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving history: {str(e)}")
 
+@app.get("/comparison-history/{comparison_id}")
+def get_comparison(comparison_id: int, db: Session = Depends(get_db)):
+    comparison = db.get(Comparison, comparison_id)
+    if comparison is None:
+        raise HTTPException(status_code=404, detail=f"Comparación {comparison_id} no encontrada")
+    return serialize_comparison(comparison, include_details=True)
+
 @app.delete("/clear-history")
-async def clear_comparison_history(db: Session = Depends(get_db)):
+def clear_comparison_history(db: Session = Depends(get_db)):
     try:
         db.query(Comparison).delete()
         db.commit()
@@ -426,4 +297,20 @@ async def clear_comparison_history(db: Session = Depends(get_db)):
     except Exception as e:
         db.rollback()
         logger.error(f"🔴 [MAIN] Error clearing comparison history: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error al borrar el historial: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error al borrar el historial: {str(e)}")
+
+@app.get("/cache-stats")
+async def get_cache_stats():
+    return {
+        "pages": page_cache.get_stats(),
+        "embeddings": embedding_cache.get_stats(),
+        "llm": llm_cache.get_stats(),
+        "translations": translator.get_stats()
+    }
+
+@app.get("/llm-stats")
+async def get_llm_stats():
+    return {
+        "scheduler": llm_scheduler.get_stats(),
+        "jobs": job_manager.get_stats()
+    }
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from typing import List
+from pydantic import BaseModel, Field
 
 class CompareRequest(BaseModel):
     url1: str
@@ -9,4 +10,21 @@ class CompareSubjectsRequest(BaseModel):
     url1: str
     subject_title1: str
     url2: str
-    subject_title2: str
\ No newline at end of file
+    subject_title2: str
+
+class SearchRequest(BaseModel):
+    url1: str
+    subject_title: str
+    top_k: int = Field(10, gt=0)
+
+class SourceSubject(BaseModel):
+    url1: str
+    subject_title: str
+
+class CompareBatchRequest(BaseModel):
+    url2: str
+    subjects: List[SourceSubject]
+
+class IngestGuideRequest(BaseModel):
+    guide_url: str
+    restart: bool = False
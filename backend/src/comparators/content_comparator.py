@@ -4,7 +4,8 @@ import time
 from fastapi import HTTPException
 from concurrent.futures import ThreadPoolExecutor
 from typing import Dict
-from src.llm.client import llm
+from src.llm.client import invoke_llm, discard_cached_completion
+from src.llm.scheduler import bind_priority
 from src.utils.json_utils import safe_json_parse
 from src.utils.embedding_utils import compute_embedding_similarity
 from src.llm.prompts import get_subject_expert_prompt
@@ -85,7 +86,7 @@ def compute_embedding_similarities(comp1: Dict[str, str], comp2: Dict[str, str])
     embed_scores = {}
     with ThreadPoolExecutor(max_workers=3) as executor:
         futures = {
-            key: executor.submit(cosine_sim, comp1[key], comp2[key])
+            key: executor.submit(bind_priority(cosine_sim), comp1[key], comp2[key])
             for key in ['contents', 'objectives', 'competences']
         }
         for key, future in futures.items():
@@ -106,7 +107,7 @@ def qualitative_analysis(comp1: Dict[str, str], comp2: Dict[str, str], final_sco
     try:
         logger.debug(f"🟠 [EMBED-QA] Prompt enviado al LLM:\n{prompt[:500]}...")
         start_time = time.time()
-        response = llm.invoke(prompt)
+        response = invoke_llm(prompt, "subject_expert")
         logger.info(f"🟠 [EMBED-QA] Respuesta LLM recibida en {time.time()-start_time:.2f}s")
         logger.info(f"🟠 [EMBED-QA] Respuesta completa LLM:\n{response}")
 
@@ -151,6 +152,7 @@ def qualitative_analysis(comp1: Dict[str, str], comp2: Dict[str, str], final_sco
         return analysis
     except Exception as e:
         logger.error(f"🔴 [EMBED-QA] Error inesperado: {str(e)}", exc_info=True)
+        discard_cached_completion(prompt)
         return {
             "similitudes_tecnicas": [],
             "diferencias_sustanciales": [],
@@ -1,48 +1,118 @@
 import logging
 import re
 import difflib
-from typing import Dict
-from src.llm.client import llm
-from src.utils.embedding_utils import compute_embedding_similarity
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from src.llm.client import invoke_llm, discard_cached_completion
+from src.llm.scheduler import bind_priority
+from src.utils.embedding_utils import compute_embedding_similarities_batch
 from src.llm.prompts import get_theme_comparator_prompt
 from src.utils.lang_detect import ensure_english
 
 logger = logging.getLogger(__name__)
 
+WEIGHTS = {"core_topic": 0.4, "key_contents": 0.4, "application_domain": 0.2}
+LLM_WORKERS = 5
+
 def compare_themes(theme1: Dict[str, str], theme2: Dict[str, str], subject_name1: str = "", subject_name2: str = "") -> float:
     logger.debug("🔍 Comparando temas:")
     logger.debug(f"Tema 1 ({subject_name1}):\n{theme1}")
     logger.debug(f"Tema 2 ({subject_name2}):\n{theme2}")
-    
-    if not theme1 or not theme2:
-        return 0.0
-    if all(theme1[key] == theme2[key] for key in theme1):
-        return 1.0
+    return compare_themes_batch(theme1, [theme2], subject_name1, [subject_name2])[0]
+
+def compare_themes_batch(theme1: Dict[str, str], themes: List[Dict[str, str]], subject_name1: str = "", subject_names: List[str] = None) -> List[float]:
+    return _compare_themes(theme1, themes, subject_name1, subject_names)[0]
+
+def compare_themes_cascade(theme1: Dict[str, str], themes: List[Dict[str, str]], subject_name1: str = "",
+                           subject_names: List[str] = None, threshold: float = 0.66) -> Tuple[List[Optional[float]], Dict[str, int]]:
+    """Like compare_themes_batch, but skips the LLM judge (score None) for candidates that cannot reach threshold."""
+    return _compare_themes(theme1, themes, subject_name1, subject_names, threshold)
+
+def _compare_themes(theme1: Dict[str, str], themes: List[Dict[str, str]], subject_name1: str = "",
+                    subject_names: List[str] = None, threshold: float = None) -> Tuple[List[Optional[float]], Dict[str, int]]:
+    subject_names = subject_names or [""] * len(themes)
+    scores: List[Optional[float]] = [0.0] * len(themes)
+    stats = {"candidates": len(themes), "empty": 0, "identical": 0, "pruned_cheap": 0, "llm_judged": 0}
+    if not theme1:
+        stats["empty"] = len(themes)
+        return scores, stats
+
+    pending = []
+    for i, theme2 in enumerate(themes):
+        if not theme2:
+            stats["empty"] += 1
+            continue
+        if all(theme1[key] == theme2[key] for key in theme1):
+            scores[i] = 1.0
+            stats["identical"] += 1
+        else:
+            pending.append(i)
+    if not pending:
+        return scores, stats
 
-    weights = {"core_topic": 0.4, "key_contents": 0.4, "application_domain": 0.2}
     similarities = {}
-    for field in weights:
+    for field in WEIGHTS:
         text1 = theme1.get(field, "Unknown")
-        text2 = theme2.get(field, "Unknown")
-        logger.debug(f"🔎 Comparando campo '{field}':")
-        logger.debug(f"  - Texto 1: {text1[:200]}...")
-        logger.debug(f"  - Texto 2: {text2[:200]}...")
-
-        if text1 == "Unknown" or text2 == "Unknown":
-            similarities[field] = 0.0
+        texts2 = [themes[i].get(field, "Unknown") for i in pending]
+        logger.debug(f"🔎 Comparando campo '{field}' contra {len(pending)} temas")
+        if text1 == "Unknown":
+            similarities[field] = np.zeros(len(pending))
         else:
-            similarities[field] = compute_embedding_similarity(text1, text2, logger, adjust=False)
+            candidates = ["" if text2 == "Unknown" else text2 for text2 in texts2]
+            similarities[field] = np.asarray(compute_embedding_similarities_batch(text1, candidates, logger, adjust=False))
+
+    title_similarities = np.array([
+        difflib.SequenceMatcher(None, subject_name1.lower(), subject_names[i].lower()).ratio()
+        if subject_name1 and subject_names[i] else 0.0
+        for i in pending
+    ])
 
-    title_similarity = 0.0
-    if subject_name1 and subject_name2:
-        title_similarity = difflib.SequenceMatcher(None, subject_name1.lower(), subject_name2.lower()).ratio()
-        logger.info(f"Title similarity between '{subject_name1}' and '{subject_name2}': {title_similarity:.2f}")
+    weighted_scores = sum(similarities[field] * WEIGHTS[field] for field in WEIGHTS)
+    score_floors = np.array([_score_floor(theme1, themes[i]) for i in pending])
 
+    judged = np.ones(len(pending), dtype=bool)
+    if threshold is not None:
+        # El LLM aporta como mucho 0.45: si ni con la nota máxima se llega al umbral, no se le pregunta
+        upper_bounds = 0.45 * weighted_scores + 0.45 * 1.0 + 0.1 * title_similarities
+        judged = (np.round(np.minimum(upper_bounds, 1.0), 2) >= threshold) | (score_floors >= threshold)
+        stats["pruned_cheap"] = int((~judged).sum())
+    stats["llm_judged"] = int(judged.sum())
+
+    llm_scores = np.zeros(len(pending))
+    judged_positions = np.flatnonzero(judged)
+    with ThreadPoolExecutor(max_workers=LLM_WORKERS) as executor:
+        llm_scores[judged_positions] = list(executor.map(bind_priority(lambda p: llm_theme_score(theme1, themes[pending[p]])), judged_positions))
+
+    final_scores = 0.45 * weighted_scores + 0.45 * llm_scores + 0.1 * title_similarities
+    for position, i in enumerate(pending):
+        if not judged[position]:
+            scores[i] = None
+            logger.info(f"Theme comparison ({subject_names[i]}) - pruned before LLM, upper bound below {threshold}")
+            continue
+        theme2 = themes[i]
+        final_score = max(float(final_scores[position]), float(score_floors[position]))
+        scores[i] = round(min(max(final_score, 0.0), 1.0), 2)
+        logger.info(
+            f"Theme comparison ({subject_names[i]}) - Embedding: { {field: round(float(similarities[field][position]), 4) for field in WEIGHTS} }, "
+            f"LLM: {llm_scores[position]}, Title: {title_similarities[position]:.2f}, Final: {scores[i]}"
+        )
+    if threshold is not None:
+        logger.info(f"Theme cascade - {stats}")
+    return scores, stats
+
+def _score_floor(theme1: Dict[str, str], theme2: Dict[str, str]) -> float:
+    if theme1.get('core_topic') == theme2.get('core_topic') and theme1.get('key_contents') == theme2.get('key_contents'):
+        return 0.90
+    if theme1.get('core_topic') == theme2.get('core_topic'):
+        return 0.80
+    return 0.0
+
+def llm_theme_score(theme1: Dict[str, str], theme2: Dict[str, str]) -> float:
     prompt = get_theme_comparator_prompt(theme1, theme2)
     logger.debug(f"📝 Prompt enviado al LLM:\n{prompt[:500]}...")
-    
     try:
-        llm_response = llm.invoke(prompt).strip()
+        llm_response = invoke_llm(prompt, "theme_comparator").strip()
         logger.info(f"Raw LLM response for theme comparison: {llm_response}")
         match = re.search(r"0?\.\d{1,2}", llm_response)
         if match:
@@ -51,16 +121,8 @@ def compare_themes(theme1: Dict[str, str], theme2: Dict[str, str], subject_name1
         else:
             logger.warning(f"No numeric score found in LLM response: {llm_response}")
             llm_score = 0.0
+            discard_cached_completion(prompt)
     except Exception as e:
         logger.error(f"Error in LLM theme comparison: {e}")
         llm_score = 0.0
-
-    weighted_score = sum(similarities[field] * weights[field] for field in weights)
-    final_score = 0.45 * weighted_score + 0.45 * llm_score + 0.1 * title_similarity
-    if theme1.get('core_topic') == theme2.get('core_topic') and theme1.get('key_contents') == theme2.get('key_contents'):
-        final_score = max(final_score, 0.90)
-    elif theme1.get('core_topic') == theme2.get('core_topic'):
-        final_score = max(final_score, 0.80)
-    final_score = round(min(max(final_score, 0.0), 1.0), 2)
-    logger.info(f"Theme comparison - Embedding: {similarities}, LLM: {llm_score}, Title: {title_similarity:.2f}, Final: {final_score}")
-    return final_score
\ No newline at end of file
+    return llm_score
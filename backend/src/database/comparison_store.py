@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import or_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session, load_only
+from src.database.database import Comparison
+
+COMPARISON_KEY = ("comparison_type", "url1", "subject_title1", "url2", "subject_title2")
+SUMMARY_COLUMNS = (
+    "id", "created_at", "comparison_type", "url1", "subject_title1", "url2", "subject_title2",
+    "guide_url", "similarity_score", "theme_similarity"
+)
+DETAIL_COLUMNS = ("components", "analysis", "explanation")
+
+def find_comparison(db: Session, comparison_type: str, url1: str, subject_title1: str, url2: str, subject_title2: str) -> Comparison:
+    return db.query(Comparison).filter(
+        Comparison.comparison_type == comparison_type,
+        Comparison.url1 == url1,
+        Comparison.subject_title1 == subject_title1,
+        Comparison.url2 == url2,
+        Comparison.subject_title2 == subject_title2
+    ).first()
+
+def find_comparisons_by_url2(db: Session, comparison_type: str, url1: str, subject_title1: str, urls2: List[str]) -> Dict[str, Comparison]:
+    """Existing comparisons of one source subject against several candidate URLs, in a single query."""
+    if not urls2:
+        return {}
+    rows = db.query(Comparison).filter(
+        Comparison.comparison_type == comparison_type,
+        Comparison.url1 == url1,
+        Comparison.subject_title1 == subject_title1,
+        Comparison.url2.in_(urls2)
+    ).all()
+    return {row.url2: row for row in rows}
+
+def upsert_comparison(db: Session, values: Dict) -> None:
+    """Inserts the comparison or updates the row with the same COMPARISON_KEY in one statement; the caller commits."""
+    # INSERT ... ON CONFLICT sobre el índice único: dos peticiones concurrentes no pueden duplicar la fila
+    statement = insert(Comparison).values(**values)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=list(COMPARISON_KEY),
+        set_={key: statement.excluded[key] for key in values if key not in COMPARISON_KEY}
+    ))
+
+def query_comparison_history(db: Session, limit: int = 50, cursor: int = None, comparison_type: str = None, url: str = None,
+                             date_from: datetime = None, date_to: datetime = None, min_score: float = None,
+                             include_details: bool = False) -> Tuple[List[Comparison], Optional[int]]:
+    """Newest-first page of comparisons after cursor (an id); returns the rows and the cursor of the next page."""
+    columns = SUMMARY_COLUMNS + (DETAIL_COLUMNS if include_details else ())
+    query = db.query(Comparison).options(load_only(*(getattr(Comparison, column) for column in columns)))
+    if cursor is not None:
+        query = query.filter(Comparison.id < cursor)
+    if comparison_type:
+        query = query.filter(Comparison.comparison_type == comparison_type)
+    if url:
+        query = query.filter(or_(Comparison.url1 == url, Comparison.url2 == url, Comparison.guide_url == url))
+    if date_from:
+        query = query.filter(Comparison.created_at >= date_from)
+    if date_to:
+        query = query.filter(Comparison.created_at <= date_to)
+    if min_score is not None:
+        query = query.filter(Comparison.similarity_score >= min_score)
+
+    rows = query.order_by(Comparison.id.desc()).limit(limit + 1).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def serialize_comparison(comparison: Comparison, include_details: bool = False) -> Dict:
+    data = {column: getattr(comparison, column) for column in SUMMARY_COLUMNS}
+    data["created_at"] = comparison.created_at.isoformat() if comparison.created_at else None
+    if include_details:
+        data.update({column: getattr(comparison, column) for column in DETAIL_COLUMNS})
+    return data
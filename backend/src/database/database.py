@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON
+from sqlalchemy import create_engine, event, inspect, text, Column, Index, Integer, String, Float, DateTime, JSON, Text, LargeBinary, ForeignKey, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -8,8 +8,79 @@ engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-20000")
+    cursor.close()
+
+class Guide(Base):
+    __tablename__ = "guides"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String, nullable=False, unique=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    ingested_at = Column(DateTime, nullable=True)
+    subject_count = Column(Integer, nullable=True)
+
+class Subject(Base):
+    __tablename__ = "subjects"
+    __table_args__ = (UniqueConstraint("url", "title"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    content_hash = Column(String, nullable=True)
+    raw_text = Column(Text, nullable=True)
+    details = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class GuideSubject(Base):
+    """Membership of a subject in a guide; the same subject page can be listed by several degree guides."""
+    __tablename__ = "guide_subjects"
+    __table_args__ = (UniqueConstraint("guide_id", "subject_id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    guide_id = Column(Integer, ForeignKey("guides.id"), nullable=False)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class SubjectTheme(Base):
+    __tablename__ = "subject_themes"
+    __table_args__ = (UniqueConstraint("subject_id", "content_hash", "model"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False)
+    content_hash = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    theme = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class SubjectEmbedding(Base):
+    __tablename__ = "subject_embeddings"
+    __table_args__ = (UniqueConstraint("subject_id", "field", "model"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False)
+    field = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    text_hash = Column(String, nullable=False)
+    vector = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class Comparison(Base):
     __tablename__ = "comparisons"
+    __table_args__ = (
+        # Mismo orden que los filtros de las búsquedas de comparaciones ya calculadas; único para poder hacer upsert
+        Index("ix_comparisons_pair", "comparison_type", "url1", "subject_title1", "url2", "subject_title2", unique=True),
+        Index("ix_comparisons_guide", "comparison_type", "url1", "subject_title1", "guide_url"),
+        Index("ix_comparisons_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -26,9 +97,41 @@ class Comparison(Base):
     detalles_origen = Column(JSON, nullable=True)
     detalles_comparada = Column(JSON, nullable=True)
     theme_similarity = Column(Float, nullable=True)
+    subject1_id = Column(Integer, ForeignKey("subjects.id"), nullable=True)
+    subject2_id = Column(Integer, ForeignKey("subjects.id"), nullable=True)
 
 Base.metadata.create_all(bind=engine)
 
+def _migrate() -> None:
+    # create_all no modifica tablas existentes: columnas e índices nuevos se añaden a mano
+    existing = {column["name"] for column in inspect(engine).get_columns("comparisons")}
+    with engine.begin() as conn:
+        for column in ("subject1_id", "subject2_id"):
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE comparisons ADD COLUMN {column} INTEGER REFERENCES subjects(id)"))
+    # La antigua columna subjects.guide_id (una sola guía por asignatura) pasa a la tabla de pertenencia
+    if "guide_id" in {column["name"] for column in inspect(engine).get_columns("subjects")}:
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT OR IGNORE INTO guide_subjects (guide_id, subject_id, created_at) "
+                "SELECT guide_id, id, CURRENT_TIMESTAMP FROM subjects WHERE guide_id IS NOT NULL"
+            ))
+    pair_index = next(index for index in Comparison.__table__.indexes if index.name == "ix_comparisons_pair")
+    existing_pair = next((index for index in inspect(engine).get_indexes("comparisons") if index["name"] == pair_index.name), None)
+    if existing_pair is None or not existing_pair["unique"]:
+        # Bases anteriores: se conserva la fila más reciente de cada par antes de crear el índice único
+        with engine.begin() as conn:
+            conn.execute(text(
+                "DELETE FROM comparisons WHERE id NOT IN (SELECT MAX(id) FROM comparisons "
+                "GROUP BY comparison_type, url1, subject_title1, url2, subject_title2)"
+            ))
+            if existing_pair is not None:
+                conn.execute(text(f"DROP INDEX {pair_index.name}"))
+    for index in Comparison.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+_migrate()
+
 def get_db():
     db = SessionLocal()
     try:
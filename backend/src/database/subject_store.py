@@ -0,0 +1,116 @@
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from src.database.database import Guide, GuideSubject, Subject, SubjectTheme, SubjectEmbedding
+
+# SQLite admite un único escritor: los hilos del proceso serializan aquí sus escrituras
+store_lock = threading.Lock()
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def get_or_create_guide(db: Session, url: str) -> Guide:
+    guide = db.query(Guide).filter(Guide.url == url).first()
+    if guide is None:
+        guide = Guide(url=url)
+        db.add(guide)
+        db.flush()
+    return guide
+
+def get_subject(db: Session, url: str, title: str) -> Optional[Subject]:
+    return db.query(Subject).filter(Subject.url == url, Subject.title == title).first()
+
+def find_subject_id(db: Session, url: str, title: str) -> Optional[int]:
+    subject = get_subject(db, url, title)
+    return subject.id if subject else None
+
+def is_guide_subject(db: Session, guide_url: str, subject: Subject) -> bool:
+    return db.query(GuideSubject).join(Guide, Guide.id == GuideSubject.guide_id).filter(
+        Guide.url == guide_url, GuideSubject.subject_id == subject.id
+    ).first() is not None
+
+def add_guide_subject(db: Session, guide_url: str, subject: Subject) -> None:
+    """Records that the guide lists the subject; memberships in other guides are kept."""
+    guide = get_or_create_guide(db, guide_url)
+    exists = db.query(GuideSubject).filter(GuideSubject.guide_id == guide.id, GuideSubject.subject_id == subject.id).first()
+    if exists is None:
+        db.add(GuideSubject(guide_id=guide.id, subject_id=subject.id))
+        db.flush()
+
+def upsert_subject(db: Session, url: str, title: str, raw_text: str = None, details: Dict = None, guide_url: str = None) -> Subject:
+    """Creates or updates the subject row (and its membership in guide_url); a new raw text invalidates the stored details."""
+    subject = get_subject(db, url, title)
+    if subject is None:
+        subject = Subject(url=url, title=title)
+        db.add(subject)
+    if raw_text is not None:
+        new_hash = content_hash(raw_text)
+        if new_hash != subject.content_hash:
+            subject.raw_text = raw_text
+            subject.content_hash = new_hash
+            subject.details = None
+    if details is not None:
+        subject.details = details
+    db.flush()
+    if guide_url:
+        add_guide_subject(db, guide_url, subject)
+    return subject
+
+def stored_theme(db: Session, subject: Subject, model: str) -> Optional[Dict]:
+    if subject.content_hash is None:
+        return None
+    row = db.query(SubjectTheme).filter(
+        SubjectTheme.subject_id == subject.id,
+        SubjectTheme.content_hash == subject.content_hash,
+        SubjectTheme.model == model
+    ).first()
+    return row.theme if row else None
+
+def save_theme(db: Session, subject: Subject, model: str, theme: Dict) -> None:
+    if subject.content_hash is None or stored_theme(db, subject, model) is not None:
+        return
+    db.add(SubjectTheme(subject_id=subject.id, content_hash=subject.content_hash, model=model, theme=theme))
+    db.flush()
+
+def save_embeddings(db: Session, subject: Subject, model: str, embeddings: Dict[str, tuple]) -> None:
+    """embeddings maps field -> (text_hash, vector); existing rows for the same field and model are replaced."""
+    for field, (text_hash, vector) in embeddings.items():
+        row = db.query(SubjectEmbedding).filter(
+            SubjectEmbedding.subject_id == subject.id,
+            SubjectEmbedding.field == field,
+            SubjectEmbedding.model == model
+        ).first()
+        if row is None:
+            row = SubjectEmbedding(subject_id=subject.id, field=field, model=model)
+            db.add(row)
+        row.text_hash = text_hash
+        row.vector = np.asarray(vector, dtype=np.float32).tobytes()
+    db.flush()
+
+def load_embeddings(db: Session, subject_ids: List[int], model: str) -> Dict[int, Dict[str, tuple]]:
+    rows = db.query(SubjectEmbedding).filter(
+        SubjectEmbedding.subject_id.in_(subject_ids),
+        SubjectEmbedding.model == model
+    ).all()
+    embeddings: Dict[int, Dict[str, tuple]] = {}
+    for row in rows:
+        embeddings.setdefault(row.subject_id, {})[row.field] = (row.text_hash, np.frombuffer(row.vector, dtype=np.float32))
+    return embeddings
+
+def ingested_guide_subjects(db: Session, guide_url: str) -> Optional[List[Subject]]:
+    guide = db.query(Guide).filter(Guide.url == guide_url, Guide.ingested_at.isnot(None)).first()
+    if guide is None:
+        return None
+    return db.query(Subject).join(GuideSubject, GuideSubject.subject_id == Subject.id).filter(
+        GuideSubject.guide_id == guide.id
+    ).order_by(Subject.id).all()
+
+def mark_guide_ingested(db: Session, guide_url: str, subject_count: int, complete: bool = True) -> None:
+    """Records the ingestion run; only a complete guide (no failed subjects) is served from the store instead of crawled."""
+    guide = get_or_create_guide(db, guide_url)
+    guide.ingested_at = datetime.utcnow() if complete else None
+    guide.subject_count = subject_count
+    db.flush()
@@ -1,13 +1,29 @@
 import re
 import logging
-from typing import List, Dict
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Pattern, Tuple
+from bs4 import Tag
 from fastapi import HTTPException
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-from src.utils.url_utils import fetch_url_content
+from src.extractors.pdf_extractor import pdf_links, pdf_outline_subjects
+from src.utils.url_utils import fetch_document
+from src.utils.html_utils import parse_html
 
 logger = logging.getLogger(__name__)
 
+# Reglas por universidad para reconocer enlaces a asignaturas; se combinan en una sola regex
+SUBJECT_LINK_RULES: Dict[str, str] = {
+    "cvut": r"(?s:^(?=.*cvut\.cz).*predmet)",                       # Erasmus Praga
+    "urv": r"(?s:^(?=.*urv\.cat).*assignatura=)",                   # URV
+    "fib": r"/(?:asignaturas|assignatures|syllabus)/[A-Z0-9]+$",    # Exemple FIB
+    "udl": r"guiadocent\.udl\.cat/.*/\d{4}-\d{2}_\d+$",            # Exemple UdL
+}
+
+def _compile_link_rules(rules: Dict[str, str]) -> Pattern:
+    return re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in rules.items()))
+
+SUBJECT_LINK_PATTERN = _compile_link_rules(SUBJECT_LINK_RULES)
+
 def extract_subjects_from_guide_generic(guide_url: str, max_subjects: int) -> List[Dict]:
     logger.info(f"🔵 Procesando guía de grado (genérico): {guide_url}")
 
@@ -34,22 +50,31 @@ def extract_subjects_from_guide_generic(guide_url: str, max_subjects: int) -> Li
     logger.info(f"🟢 Total asignaturas extraídas: {len(subjects_data)}")
     return subjects_data
 
-def extract_all_links_from_page(guide_url: str, max_links: int) -> List[Dict]:
-    logger.info(f"🔵 Procesando todos los enlaces de la página (casos especiales): {guide_url}")
-
-    try:
-        content = fetch_url_content(guide_url)
-    except Exception as e:
-        logger.error(f"❌ Error descargando la guía: {e}")
-        raise HTTPException(status_code=500, detail=f"Error fetch: {e}")
+def add_subject_link_rule(name: str, pattern: str) -> None:
+    """Registers (or replaces) a university rule; pattern is searched against the absolute link URL."""
+    global SUBJECT_LINK_PATTERN
+    SUBJECT_LINK_RULES[name] = pattern
+    SUBJECT_LINK_PATTERN = _compile_link_rules(SUBJECT_LINK_RULES)
+
+def link_context(a_tag: Tag) -> str:
+    """HTML of the row/item/block containing a link, flattened to one line; only built when asked for."""
+    parent = a_tag.find_parent(["tr", "li", "div", "td"])
+    context_html = parent.prettify() if parent else a_tag.prettify()
+    return context_html.replace('"', '').replace('\n', ' ').strip()
+
+def _html_links(content: str, with_context: bool) -> Iterator[Tuple[str, Callable[[], str], Callable[[], str]]]:
+    # Sin contexto solo interesan los enlaces: el resto del árbol ni se construye
+    soup = parse_html(content) if with_context else parse_html(content, only=("a",))
+    for a_tag in soup.find_all("a", href=True):
+        yield a_tag["href"], partial(a_tag.get_text, strip=True), partial(link_context, a_tag)
 
-    soup = BeautifulSoup(content, "html.parser")
+def _subject_links(guide_url: str, links: Iterable[Tuple[str, Callable[[], str], Optional[Callable[[], str]]]],
+                   max_links: int, with_context: bool) -> List[Dict]:
     visited_urls = set()
     all_links: List[Dict] = []
 
-    for a_tag in soup.find_all("a", href=True):
-        link_text = a_tag.get_text(strip=True).lower().strip()
-        href = a_tag["href"].strip()
+    for href, link_text, context in links:
+        href = href.strip()
 
         if not href:
             continue
@@ -63,28 +88,40 @@ def extract_all_links_from_page(guide_url: str, max_links: int) -> List[Dict]:
             continue
         visited_urls.add(full_url)
 
-        parent = a_tag.find_parent(["tr", "li", "div", "td"])
-        context_html = parent.prettify() if parent else a_tag.prettify()
-        context_html = context_html.replace('"', '').replace('\n', ' ').strip()
-
-        is_valid = (
-            ("cvut.cz" in full_url and "predmet" in full_url) or        # Erasmus Praga
-            ("urv.cat" in full_url and "assignatura=" in full_url) or   # URV
-            re.search(r"/(asignaturas|assignatures|syllabus)/[A-Z0-9]+$", full_url) or # Exemple FIB
-            re.search(r"guiadocent\.udl\.cat/.*/\d{4}-\d{2}_\d+$", full_url)  # Exemple UdL
-        )
-
-        if is_valid:
+        if SUBJECT_LINK_PATTERN.search(full_url):
             logger.info(f"🔗 Enlace válido detectado: {full_url}")
-            all_links.append({
-                "link_text": link_text,
-                "url": full_url,
-                "context_html": context_html
-            })
+            link = {"link_text": link_text().lower().strip(), "url": full_url}
+            if with_context:
+                link["context_html"] = context() if context else ""
+            all_links.append(link)
 
         if max_links > 0 and len(all_links) >= max_links:
             logger.info(f"🔵 Límite de {max_links} enlaces alcanzado")
             break
+    return all_links
+
+def extract_all_links_from_page(guide_url: str, max_links: int, with_context: bool = False) -> List[Dict]:
+    logger.info(f"🔵 Procesando todos los enlaces de la página (casos especiales): {guide_url}")
+
+    try:
+        content = fetch_document(guide_url)
+    except Exception as e:
+        logger.error(f"❌ Error descargando la guía: {e}")
+        raise HTTPException(status_code=500, detail=f"Error fetch: {e}")
+
+    if isinstance(content, str):
+        all_links = _subject_links(guide_url, _html_links(content, with_context), max_links, with_context)
+    else:
+        logger.info("📄 Guía en PDF: se recorren los enlaces página a página")
+        # El documento se cierra también si falla el recorrido de sus páginas
+        with content:
+            pdf_link_items = ((uri, link_text, None) for uri, link_text in pdf_links(content))
+            all_links = _subject_links(guide_url, pdf_link_items, max_links, with_context)
+            if not all_links:
+                # Guía sin enlaces: cada entrada del índice del PDF es una asignatura (guia.pdf#page=N)
+                all_links = pdf_outline_subjects(content, guide_url)
+                if max_links > 0:
+                    all_links = all_links[:max_links]
 
     logger.info(f"✅ Extraídos {len(all_links)} enlaces válidos de casos especiales")
-    return all_links
\ No newline at end of file
+    return all_links
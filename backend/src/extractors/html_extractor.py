@@ -1,14 +1,13 @@
 import logging
 from typing import Optional
-from bs4 import BeautifulSoup
 from src.extractors.urv_extractor import extract_urv_contents
-from src.utils.html_utils import clean_html
+from src.utils.html_utils import parse_html, node_text
 
 logger = logging.getLogger(__name__)
 
 def extract_contents_section(full_text: str) -> Optional[str]:
     logger.debug(f"🔍 Attempting to extract contents section from text (first 500 chars): {full_text[:500]}")
-    soup = BeautifulSoup(full_text, 'html.parser')
+    soup = parse_html(full_text)
 
     if "urv.cat" in full_text.lower() or "guiadocent.urv.cat" in full_text.lower():
         logger.info("🔍 Detected potential URV content, attempting URV contents extraction")
@@ -31,7 +30,7 @@ def extract_contents_section(full_text: str) -> Optional[str]:
             next_node = header.next_sibling
             while next_node:
                 if next_node.name in ['div', 'section', 'ul', 'ol', 'table', 'p']:
-                    content_parts.append(clean_html(str(next_node)))
+                    content_parts.append(node_text(next_node))
                 elif next_node.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
                     break
                 next_node = next_node.next_sibling
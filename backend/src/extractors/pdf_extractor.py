@@ -0,0 +1,112 @@
+import logging
+import os
+import re
+from typing import Callable, Dict, Iterator, List, Optional, Pattern, Tuple
+from urllib.parse import urldefrag
+import fitz
+
+logger = logging.getLogger(__name__)
+
+PDF_SECTION_MAX_CHARS = int(os.getenv("PDF_SECTION_MAX_CHARS", "2000"))
+PDF_HEADING_MAX_WORDS = 6
+PAGE_FRAGMENT_PATTERN = re.compile(r"(?:^|&)page=(\d+)")
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+def pdf_start_page(url: str) -> int:
+    """0-based page given by a #page=N fragment (the form used for subjects inside a PDF guide), else 0."""
+    match = PAGE_FRAGMENT_PATTERN.search(urldefrag(url)[1])
+    return max(int(match.group(1)) - 1, 0) if match else 0
+
+def subject_page_range(document: fitz.Document, subject_title: str = None, start_page: int = 0) -> Tuple[int, int, Optional[str], Optional[str]]:
+    """Pages [start, end) of a subject located through the outline, so no page is decoded to find it.
+
+    Also returns the subject's and the next outline entry's titles, which delimit the subject inside the first and last page.
+    """
+    title = _normalize(subject_title or "")
+    toc = document.get_toc(simple=True) if title else []
+    matches = [position for position, (_, entry_title, page) in enumerate(toc) if page >= 1 and title in _normalize(entry_title)]
+    # Con varias entradas del mismo nombre manda la página del fragmento #page=N
+    matches.sort(key=lambda position: toc[position][2] != start_page + 1)
+    for position in matches[:1]:
+        level, entry_title, page = toc[position]
+        following = next(((t, p) for l, t, p in toc[position + 1:] if l <= level and p >= page), None)
+        end = min(following[1], document.page_count) if following else document.page_count
+        return page - 1, end, entry_title, following[0] if following else None
+    return min(start_page, document.page_count), document.page_count, None, None
+
+def _subject_lines(text: str, entry_title: Optional[str]) -> List[str]:
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if entry_title:
+        marker = _normalize(entry_title)
+        for position, line in enumerate(lines):
+            if _normalize(line).startswith(marker):
+                return lines[position + 1:]
+    return lines
+
+def _is_heading(line: str) -> bool:
+    # En texto plano no hay etiquetas: un título es una línea corta que no acaba como una frase
+    return len(line.split()) <= PDF_HEADING_MAX_WORDS and not line.endswith((".", ",", ";"))
+
+def extract_pdf_sections(document: fitz.Document, patterns: Dict[str, Pattern], subject_title: str = None,
+                         start_page: int = 0) -> Dict[str, Optional[str]]:
+    """Reads the subject's pages one at a time and stops as soon as every section has been collected."""
+    result: Dict[str, Optional[str]] = {section: None for section in patterns}
+    start, end, entry_title, next_title = subject_page_range(document, subject_title, start_page)
+    next_marker = _normalize(next_title) if next_title else None
+    current: List[str] = []
+    lines: List[str] = []
+
+    def close() -> None:
+        text = "\n".join(lines)[:PDF_SECTION_MAX_CHARS]
+        if text:
+            for section in current:
+                result[section] = text
+        current.clear()
+        lines.clear()
+
+    pages_read, finished = 0, False
+    for page_number in range(start, end):
+        text = document.load_page(page_number).get_text("text")
+        pages_read += 1
+        # En la primera página se descarta lo anterior al título (final de la asignatura previa)
+        for line in _subject_lines(text, entry_title if page_number == start else None):
+            if next_marker and _normalize(line).startswith(next_marker):
+                finished = True
+                break
+            if _is_heading(line):
+                matched = [section for section, pattern in patterns.items() if pattern.search(line.lower())]
+                if matched:
+                    close()
+                    current.extend(section for section in matched if result[section] is None)
+                    continue
+            if current:
+                lines.append(line)
+                if sum(map(len, lines)) >= PDF_SECTION_MAX_CHARS:
+                    close()
+        if finished or (not current and all(value is not None for value in result.values())):
+            break
+    close()
+    logger.info(f"📄 PDF: {pages_read}/{document.page_count} páginas leídas (páginas {start + 1}-{end})")
+    return result
+
+def pdf_links(document: fitz.Document) -> Iterator[Tuple[str, Callable[[], str]]]:
+    """Yields (uri, text getter) for every external link, one page at a time; the text is only read when asked for."""
+    for page_number in range(document.page_count):
+        page = document.load_page(page_number)
+        for link in page.get_links():
+            if link.get("kind") == fitz.LINK_URI and link.get("uri"):
+                yield link["uri"], lambda page=page, rect=link["from"]: page.get_textbox(rect)
+
+def pdf_outline_subjects(document: fitz.Document, guide_url: str) -> List[Dict]:
+    """Deepest outline entries as subjects, addressed as guide_url#page=N."""
+    toc = document.get_toc(simple=True)
+    if not toc:
+        return []
+    deepest = max(level for level, _, _ in toc)
+    base_url = urldefrag(guide_url)[0]
+    return [
+        {"link_text": title.strip().lower(), "url": f"{base_url}#page={page}"}
+        for level, title, page in toc if level == deepest and page >= 1 and title.strip()
+    ]
@@ -1,51 +1,123 @@
 import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from fastapi import HTTPException
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse, parse_qs
+from bs4 import BeautifulSoup, Tag
+from urllib.parse import urlparse, parse_qs, urldefrag
+from src.extractors.pdf_extractor import extract_pdf_sections, pdf_start_page
 from src.extractors.urv_extractor import extract_urv_contents
-from src.utils.url_utils import fetch_url_content
-from src.utils.html_utils import clean_html
+from src.utils.url_utils import fetch_url_content, fetch_document, afetch_many
+from src.utils.html_utils import parse_page, node_text
 from src.utils.url_utils import build_urv_url
 
 logger = logging.getLogger(__name__)
 
-def extract_subject_from_url(subject_url: str, subject_title: str = None) -> str:
+URV_SECTIONS = [('57', 'contents'), ('56', 'objectives'), ('55', 'competences')]
+_urv_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="urv-section")
+
+HEADER_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'dt']
+CONTENT_TAGS = {'div', 'section', 'ul', 'ol', 'table', 'p', 'dd'}
+SECTION_KEYWORDS = {
+    "contents": ["contents", "temario", "programa", "syllabus", "topics", "Syllabus of lectures", "Syllabus of tutorials"],
+    "objectives": ["objectives", "objetivos", "learning outcomes", "learning results", "goals", "synopsis", "Study Objective"],
+    "competences": ["competences", "competencias", "habilidades", "skills", "synopsis"]
+}
+# Se comparan contra el título en minúsculas, igual que antes
+SECTION_PATTERNS = {section: re.compile("|".join(map(re.escape, keywords))) for section, keywords in SECTION_KEYWORDS.items()}
+
+def normalize_subject_url(subject_url: str) -> str:
     if "bilakniha.cvut.cz" in subject_url and "/cs/" in subject_url:
-        subject_url = subject_url.replace("/cs/", "/en/")
+        return subject_url.replace("/cs/", "/en/")
+    return subject_url
+
+def is_urv_url(subject_url: str) -> bool:
+    return "urv.cat" in subject_url.lower() or "guiadocent.urv.cat" in subject_url.lower()
+
+def subject_page_urls(subject_url: str) -> List[str]:
+    subject_url = normalize_subject_url(subject_url)
+    if is_urv_url(subject_url):
+        params = parse_qs(urlparse(subject_url).query)
+        return [build_urv_url(subject_url, params, fitxa) for fitxa, _ in URV_SECTIONS]
+    # Las asignaturas de una guía en PDF (guia.pdf#page=N) comparten una única descarga
+    return [urldefrag(subject_url)[0]]
+
+async def aprefetch_subject_pages(subject_urls: List[str]) -> None:
+    """Fetches every page of the given subjects concurrently into the page cache, without blocking the event loop."""
+    page_urls = [page_url for subject_url in subject_urls for page_url in subject_page_urls(subject_url)]
+    logger.info(f"📥 Prefetching {len(page_urls)} subject pages concurrently")
+    # Los errores se registran y se ignoran: la extracción posterior los vuelve a encontrar y los notifica
+    await afetch_many(page_urls)
+
+def _section_text(header: Tag) -> Optional[str]:
+    parts = []
+    for node in header.next_siblings:
+        if node.name in CONTENT_TAGS:
+            parts.append(node_text(node))
+        elif node.name in HEADER_TAGS:
+            break
+    # None si no hay ningún bloque de contenido; "" si lo hay pero está vacío (la sección cuenta como encontrada)
+    return "\n".join(part.strip() for part in parts if part.strip()) if parts else None
+
+def extract_sections(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
+    """Walks the headings once; each section takes the first heading matching its keywords that has content below."""
+    result = {section: None for section in SECTION_KEYWORDS}
+    for header in soup.find_all(HEADER_TAGS):
+        header_text = header.get_text(strip=True).lower()
+        matched = [section for section, pattern in SECTION_PATTERNS.items() if result[section] is None and pattern.search(header_text)]
+        if not matched:
+            continue
+        text = _section_text(header)
+        if text is not None:
+            for section in matched:
+                result[section] = text
+            if all(value is not None for value in result.values()):
+                break
+    return result
+
+def _extract_urv_page(url: str, subject_title: str = None) -> Optional[Dict[str, str]]:
+    response = fetch_url_content(url)
+    soup = parse_page(url, response, only=("table",))
+    return extract_urv_contents(soup, subject_title)
+
+def extract_subject_from_url(subject_url: str, subject_title: str = None) -> str:
+    subject_url = normalize_subject_url(subject_url)
 
     logger.info(f"📥 Processing subject URL: {subject_url}")
     print(f"📥 Procesando asignatura individual: {subject_url}")
 
-    is_urv = "urv.cat" in subject_url.lower() or "guiadocent.urv.cat" in subject_url.lower()
-    if is_urv:
+    if is_urv_url(subject_url):
         logger.info("🔍 Detected URV URL - attempting contents extraction")
         parsed = urlparse(subject_url)
         params = parse_qs(parsed.query)
         result = {"contents": None, "objectives": None, "competences": None}
 
-        for fitxa, section in [('57', 'contents'), ('56', 'objectives'), ('55', 'competences')]:
-            url = build_urv_url(subject_url, params, fitxa)
+        section_urls = {section: build_urv_url(subject_url, params, fitxa) for fitxa, section in URV_SECTIONS}
+        section_futures = {
+            section: _urv_executor.submit(_extract_urv_page, url, subject_title)
+            for section, url in section_urls.items()
+        }
+        main_future = _urv_executor.submit(_extract_urv_page, subject_url, subject_title)
+
+        for _, section in URV_SECTIONS:
             try:
-                logger.info(f"🔍 Fetching URV {section} from: {url}")
-                response = fetch_url_content(url)
-                soup = BeautifulSoup(response, "html.parser")
-                extracted = extract_urv_contents(soup, subject_title)
+                logger.info(f"🔍 Fetching URV {section} from: {section_urls[section]}")
+                extracted = section_futures[section].result()
                 if extracted:
                     for key in ['contents', 'objectives', 'competences']:
                         if extracted.get(key) and not result.get(key):
                             result[key] = extracted[key]
                             logger.info(f"✅ URV {key} extracted successfully")
             except Exception as e:
-                logger.error(f"⚠️ Error fetching URV {section} from {url}: {e}")
+                logger.error(f"⚠️ Error fetching URV {section} from {section_urls[section]}: {e}")
 
         if any(result.values()):
+            main_future.cancel()
             return "\n\n".join(f"{k.upper()}:\n{v}" for k, v in result.items() if v)
 
         logger.info("⚠️ No contents found at specific URV URLs, trying main page")
         try:
-            content = fetch_url_content(subject_url)
-            soup = BeautifulSoup(content, "html.parser")
-            extracted = extract_urv_contents(soup, subject_title)
+            extracted = main_future.result()
             if extracted:
                 return "\n\n".join(f"{k.upper()}:\n{v}" for k, v in extracted.items() if v)
         except Exception as e:
@@ -54,30 +126,15 @@ def extract_subject_from_url(subject_url: str, subject_title: str = None) -> str
 
     logger.info("🔍 Processing non-URV URL, searching for content sections")
     try:
-        content = fetch_url_content(subject_url)
-        soup = BeautifulSoup(content, "html.parser")
-        result = {"contents": None, "objectives": None, "competences": None}
-        section_headers = {
-            "contents": ["contents", "temario", "programa", "syllabus", "topics", "Syllabus of lectures", "Syllabus of tutorials"],
-            "objectives": ["objectives", "objetivos", "learning outcomes", "learning results", "goals", "synopsis", "Study Objective"],
-            "competences": ["competences", "competencias", "habilidades", "skills", "synopsis"]
-        }
+        content = fetch_document(subject_url)
+        if not isinstance(content, str):
+            logger.info("📄 PDF detectado, leyendo solo las páginas de la asignatura")
+            with content as document:
+                result = extract_pdf_sections(document, SECTION_PATTERNS, subject_title, pdf_start_page(subject_url))
+            return "\n\n".join(f"{k.upper()}:\n{v}" for k, v in result.items() if v)
 
-        for section, headers in section_headers.items():
-            for header in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'dt']):
-                header_text = header.get_text(strip=True).lower()
-                if any(h in header_text for h in headers):
-                    content = []
-                    next_node = header.next_sibling
-                    while next_node:
-                        if next_node.name in ['div', 'section', 'ul', 'ol', 'table', 'p', 'dd']:
-                            content.append(clean_html(str(next_node)))
-                        elif next_node.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'dt']:
-                            break
-                        next_node = next_node.next_sibling
-                    if content:
-                        result[section] = "\n".join(part.strip() for part in content if part.strip())
-                        break
+        soup = parse_page(subject_url, content)
+        result = extract_sections(soup)
 
         if any(result.values()):
             return "\n\n".join(f"{k.upper()}:\n{v}" for k, v in result.items() if v)
@@ -85,7 +142,7 @@ def extract_subject_from_url(subject_url: str, subject_title: str = None) -> str
         logger.info("⚠️ No se encontraron secciones específicas, intentando extracción genérica")
         main_content = soup.find(['div', 'section', 'article'], class_=['content', 'main-content', 'syllabus-content'])
         if main_content:
-            content = clean_html(str(main_content))
+            content = node_text(main_content)
             if content.strip():
                 return f"CONTENTS:\n{content.strip()}"
         
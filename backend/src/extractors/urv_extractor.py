@@ -1,48 +1,104 @@
 import logging
-from typing import Dict, Optional
-from bs4 import BeautifulSoup
+from functools import cached_property
+from itertools import islice
+from typing import Dict, List, Optional
+from bs4 import BeautifulSoup, Tag
 import re
 
 logger = logging.getLogger(__name__)
 
+HEADER_CLASS = 'VerdanaBlanca mainfons'
+CODE_PATTERN = re.compile(r'[A-Z]+\d+')
+UPPERCASE_TOPIC_PATTERN = re.compile(r'^[A-Z\s,]+$')
+
+class _Row:
+    """Lazily computed, memoized views of a <tr>; rows of nested tables are shared by every enclosing table."""
+
+    def __init__(self, tag: Tag):
+        self.tag = tag
+
+    @cached_property
+    def text(self) -> str:
+        return self.tag.get_text()
+
+    @cached_property
+    def cells(self) -> List[Tag]:
+        return self.tag.find_all('td')
+
+    @cached_property
+    def verdana_cells(self) -> List[Tag]:
+        return [cell for cell in self.cells if 'Verdana' in cell.get('class', [])]
+
+    @cached_property
+    def outcomes(self) -> List[str]:
+        if self.tag.find('a', class_='Ntooltip2') is None:
+            return []
+        return [obj.strip() for obj in self.tag.get_text(separator='<br>').split('<br>') if obj.strip()]
+
+    @cached_property
+    def competence(self) -> Optional[str]:
+        if not any(cell.string is not None and CODE_PATTERN.search(cell.string) for cell in self.cells):
+            return None
+        return self.tag.get_text(separator=' ', strip=True)
+
+def _is_topic_table(cells: List[Tag]) -> bool:
+    header_texts = [cell.get_text(strip=True).lower() for cell in cells if " ".join(cell.get('class', [])) == HEADER_CLASS]
+    return bool(header_texts) and ('topic' in header_texts or 'tema' in header_texts) and ('sub-topic' in header_texts or 'subtema' in header_texts)
+
+def _is_fallback_table(rows: List[_Row], cells: List[Tag]) -> bool:
+    if len(rows) <= 2 or len(rows[0].cells) < 2 or not any('Verdana' in cell.get('class', []) for cell in cells):
+        return False
+    for row in rows:
+        if len(row.verdana_cells) >= 2:
+            topic = row.verdana_cells[0].get_text(strip=True)
+            if len(topic) > 5 and not UPPERCASE_TOPIC_PATTERN.match(topic):
+                return True
+    return False
+
+def _rows_until_type(rows: List[_Row], start: int):
+    for row in islice(rows, start, None):
+        if 'Type' in row.text:
+            break
+        yield row
+
 def extract_urv_contents(soup: BeautifulSoup, subject_title: str = None) -> Optional[Dict[str, str]]:
     logger.debug("🔍 Searching for contents table with Topic/Sub-topic headers")
     result = {"contents": None, "objectives": None, "competences": None}
 
-    contents_table = None
+    row_views: Dict[int, _Row] = {}
+    topic_rows = fallback_rows = None
     for table in soup.find_all('table'):
-        headers = table.find_all('td', class_='VerdanaBlanca mainfons')
-        if headers:
-            header_texts = [header.get_text(strip=True).lower() for header in headers]
-            if ('topic' in header_texts or 'tema' in header_texts) and ('sub-topic' in header_texts or 'subtema' in header_texts):
-                contents_table = table
+        rows = [row_views.setdefault(id(tag), _Row(tag)) for tag in table.find_all('tr')]
+        if topic_rows is None or fallback_rows is None:
+            cells = table.find_all('td')
+            if topic_rows is None and _is_topic_table(cells):
+                topic_rows = rows
                 logger.info("✅ Contents table found with Topic/Sub-topic headers")
-                break
+            elif topic_rows is None and fallback_rows is None and _is_fallback_table(rows, cells):
+                fallback_rows = rows
+
+        for i, row in enumerate(rows):
+            if len(row.cells) < 3:
+                continue
+            if 'Learning outcomes' in row.text:
+                objectives = [obj for next_row in _rows_until_type(rows, i + 1) for obj in next_row.outcomes]
+                if objectives:
+                    result["objectives"] = "\n".join(objectives)
+            if 'Competences' in row.text:
+                competences = [next_row.competence for next_row in _rows_until_type(rows, i + 1) if next_row.competence]
+                if competences:
+                    result["competences"] = "\n".join(competences)
 
-    if not contents_table:
+    if topic_rows is None:
         logger.debug("🔍 No table with Topic/Sub-topic headers, trying fallback")
-        for table in soup.find_all('table'):
-            rows = table.find_all('tr')
-            if len(rows) > 2:
-                cells = rows[0].find_all('td')
-                if len(cells) >= 2 and any('Verdana' in cell.get('class', []) for cell in table.find_all('td')):
-                    content_valid = False
-                    for row in rows:
-                        row_cells = row.find_all('td', class_='Verdana')
-                        if len(row_cells) >= 2:
-                            topic = row_cells[0].get_text(strip=True)
-                            if len(topic) > 5 and not re.match(r'^[A-Z\s,]+$', topic):
-                                content_valid = True
-                                break
-                    if content_valid:
-                        contents_table = table
-                        logger.info("✅ Fallback table found with Verdana class cells")
-                        break
-
-    if contents_table:
+    if topic_rows is None and fallback_rows is not None:
+        topic_rows = fallback_rows
+        logger.info("✅ Fallback table found with Verdana class cells")
+
+    if topic_rows is not None:
         contents = []
-        for row in contents_table.find_all('tr'):
-            cells = row.find_all('td', class_='Verdana')
+        for row in topic_rows:
+            cells = row.verdana_cells
             if len(cells) >= 2:
                 topic = cells[0].get_text(strip=True)
                 subtopics = cells[1].get_text(separator="\n", strip=True).split('\n')
@@ -53,37 +109,7 @@ def extract_urv_contents(soup: BeautifulSoup, subject_title: str = None) -> Opti
         if contents:
             result["contents"] = "\n\n".join(contents)
 
-    for table in soup.find_all('table'):
-        rows = table.find_all('tr')
-        for i, row in enumerate(rows):
-            cells = row.find_all('td')
-            if len(cells) >= 3 and 'Learning outcomes' in row.get_text():
-                objectives = []
-                for next_row in rows[i+1:]:
-                    if 'Type' in next_row.get_text():
-                        break
-                    code_cell = next_row.find('a', class_='Ntooltip2')
-                    if code_cell:
-                        objectives.extend([
-                            obj.strip() 
-                            for obj in next_row.get_text(separator='<br>').split('<br>') 
-                            if obj.strip()
-                        ])
-                if objectives:
-                    result["objectives"] = "\n".join(objectives)
-
-            if len(cells) >= 3 and 'Competences' in row.get_text():
-                competences = []
-                for next_row in rows[i+1:]:
-                    if 'Type' in next_row.get_text():
-                        break
-                    code_cell = next_row.find('td', string=re.compile(r'[A-Z]+\d+'))
-                    if code_cell:
-                        competences.append(next_row.get_text(separator=' ', strip=True))
-                if competences:
-                    result["competences"] = "\n".join(competences)
-
     if any(result.values()):
         return result
     logger.info("❌ No valid contents extracted from table")
-    return None
\ No newline at end of file
+    return None
@@ -1,4 +1,9 @@
+import logging
 from langchain_community.llms import Ollama
+from src.llm.llm_cache import LLMCache, LLM_CACHE_BYPASS
+from src.llm.scheduler import llm_scheduler
+
+logger = logging.getLogger(__name__)
 
 llm = Ollama(
     model="llama3",
@@ -7,4 +12,22 @@ llm = Ollama(
     top_p=0.9,
     num_ctx=4096,
     system="You must return only valid JSON. Do not include any explanation, note, markdown, or text before or after the JSON object. Only return JSON."
-)
\ No newline at end of file
+)
+llm_cache = LLMCache()
+
+def invoke_llm(prompt: str, prompt_type: str = "default", bypass_cache: bool = False) -> str:
+    """Runs the prompt through the shared llm, reusing cached completions unless bypass_cache is set."""
+    if not (bypass_cache or LLM_CACHE_BYPASS):
+        cached = llm_cache.get(llm, prompt, prompt_type)
+        if cached is not None:
+            logger.debug(f"💾 LLM cache hit ({prompt_type})")
+            return cached
+    else:
+        llm_cache.record(prompt_type, "bypassed")
+
+    response = llm_scheduler.run("llm", llm.invoke, prompt)
+    llm_cache.set(llm, prompt, prompt_type, response)
+    return response
+
+def discard_cached_completion(prompt: str) -> None:
+    llm_cache.discard(llm, prompt)
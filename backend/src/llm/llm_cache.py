@@ -0,0 +1,72 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional
+from src.utils.disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 3600
+LLM_CACHE_TTLS = {
+    "extract_theme": 30 * DAY,
+    "extract_subjects": 30 * DAY,
+    "theme_comparator": 30 * DAY,
+    "subject_expert": 7 * DAY,
+    "translate": 90 * DAY,
+    "default": 7 * DAY,
+}
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "0") == "1"
+
+class LLMCache:
+    """Persistent completion cache keyed by the prompt and every generation parameter of the model."""
+
+    def __init__(self, ttls: Dict[str, float] = LLM_CACHE_TTLS):
+        self.ttls = ttls
+        self._disk = DiskCache("llm_completions")
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def key_for(model, prompt: str) -> str:
+        params = {
+            "model": model.model,
+            "temperature": model.temperature,
+            "top_k": model.top_k,
+            "top_p": model.top_p,
+            "num_ctx": model.num_ctx,
+            "system": model.system,
+            "prompt": prompt,
+        }
+        return hashlib.sha256(json.dumps(params, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def record(self, prompt_type: str, event: str) -> None:
+        with self._lock:
+            counters = self._stats.setdefault(prompt_type, {"hits": 0, "misses": 0, "bypassed": 0})
+            counters[event] += 1
+
+    def get(self, model, prompt: str, prompt_type: str) -> Optional[str]:
+        response = self._disk.get(self.key_for(model, prompt))
+        self.record(prompt_type, "hits" if response is not None else "misses")
+        return response
+
+    def set(self, model, prompt: str, prompt_type: str, response: str) -> None:
+        self._disk.set(self.key_for(model, prompt), response, ttl=self.ttls.get(prompt_type, self.ttls["default"]))
+
+    def discard(self, model, prompt: str) -> None:
+        self._disk.delete(self.key_for(model, prompt))
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            per_type = {name: dict(counters) for name, counters in self._stats.items()}
+        for counters in per_type.values():
+            lookups = counters["hits"] + counters["misses"]
+            counters["hit_rate"] = round(counters["hits"] / lookups, 4) if lookups else 0.0
+        hits = sum(c["hits"] for c in per_type.values())
+        lookups = hits + sum(c["misses"] for c in per_type.values())
+        return {
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": self._disk.get_stats()["entries"],
+            "by_prompt_type": per_type,
+        }
@@ -0,0 +1,103 @@
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+PRIORITIES = {"interactive": 0, "background": 1}
+WAIT_SAMPLES = 1000
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default="interactive")
+
+@contextmanager
+def llm_priority(level: str):
+    """Runs the enclosed block's LLM and embedding calls with the given priority."""
+    if level not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority: {level}")
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def bind_priority(fn: Callable) -> Callable:
+    """Wraps fn so it keeps the caller's priority when run on a pool thread."""
+    level = _priority.get()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with llm_priority(level):
+            return fn(*args, **kwargs)
+    return wrapper
+
+class LLMScheduler:
+    """Caps concurrent calls to the model server; interactive callers always go before background ones."""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.max_concurrency = max(1, max_concurrency)
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._stats = {
+            level: {"queued": 0, "max_queued": 0, "started": 0, "by_kind": {}, "waits": deque(maxlen=WAIT_SAMPLES)}
+            for level in PRIORITIES
+        }
+
+    def run(self, kind: str, fn: Callable, *args, **kwargs) -> Any:
+        """Calls fn(*args, **kwargs) once a slot is free, blocking the calling thread meanwhile."""
+        level = _priority.get()
+        ticket = (PRIORITIES[level], next(self._sequence))
+        stats = self._stats[level]
+        enqueued_at = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            stats["queued"] += 1
+            stats["max_queued"] = max(stats["max_queued"], stats["queued"])
+            while self._active >= self.max_concurrency or self._waiting[0] != ticket:
+                self._cond.wait()
+            heapq.heappop(self._waiting)
+            self._active += 1
+            stats["queued"] -= 1
+            stats["started"] += 1
+            stats["by_kind"][kind] = stats["by_kind"].get(kind, 0) + 1
+            wait = time.monotonic() - enqueued_at
+            stats["waits"].append(wait)
+            # Puede quedar otro hueco libre para el siguiente de la cola
+            self._cond.notify_all()
+        if wait > 5:
+            logger.info(f"⏳ [LLM] Llamada {kind} ({level}) esperó {wait:.1f}s en cola")
+
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            stats = {"max_concurrency": self.max_concurrency, "active": self._active}
+            for level, values in self._stats.items():
+                waits = sorted(values["waits"])
+                stats[level] = {
+                    "queued": values["queued"],
+                    "max_queued": values["max_queued"],
+                    "started": values["started"],
+                    "by_kind": dict(values["by_kind"]),
+                    "wait_avg": round(sum(waits) / len(waits), 4) if waits else 0.0,
+                    "wait_p95": round(waits[int(0.95 * (len(waits) - 1))], 4) if waits else 0.0,
+                    "wait_max": round(waits[-1], 4) if waits else 0.0,
+                }
+        return stats
+
+llm_scheduler = LLMScheduler()
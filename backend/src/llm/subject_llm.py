@@ -3,16 +3,22 @@ import re
 from typing import Dict
 from fastapi import HTTPException
 from urllib.parse import urlparse, parse_qs
-from src.llm.client import llm
+from src.llm.client import invoke_llm, discard_cached_completion
 from src.llm.prompts import get_extract_subjects_prompt, get_extract_theme_prompt
 from src.utils.json_utils import safe_json_parse
 from src.utils.url_utils import fetch_url_content, build_urv_url
 from src.extractors.urv_extractor import extract_urv_contents
 from src.extractors.html_extractor import extract_contents_section
-from bs4 import BeautifulSoup
+from src.utils.html_utils import parse_page
 
 logger = logging.getLogger(__name__)
 
+FALLBACK_THEME_PREFIX = "Extracted from title: "
+
+def is_fallback_theme(theme: Dict[str, str]) -> bool:
+    """True for the placeholder theme returned when the LLM extraction failed; it must not be cached or stored."""
+    return str(theme.get("key_contents", "")).startswith(FALLBACK_THEME_PREFIX)
+
 def extract_subject_theme(text: str, subject_title: str = None) -> Dict[str, str]:
     logger.debug(f"Subject title: {subject_title}")
     analysis_text = text
@@ -25,7 +31,7 @@ def extract_subject_theme(text: str, subject_title: str = None) -> Dict[str, str
             logger.info(f"🔍 Fetching URV contents from: {contents_url}")
             print(f"Fetching URV contents from: {contents_url}")
             response = fetch_url_content(contents_url)
-            soup = BeautifulSoup(response, "html.parser")
+            soup = parse_page(contents_url, response, only=("table",))
             contents = extract_urv_contents(soup)
             if contents:
                 logger.info("✅ URV contents extracted successfully from contents URL")
@@ -50,7 +56,7 @@ def extract_subject_theme(text: str, subject_title: str = None) -> Dict[str, str
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            response = llm.invoke(prompt).strip()
+            response = invoke_llm(prompt, "extract_theme", bypass_cache=attempt > 0).strip()
             logger.debug(f"Raw LLM response (attempt {attempt+1}): {response}")
             theme = safe_json_parse(response)
             if not all(key in theme for key in ["core_topic", "key_contents", "application_domain"]):
@@ -64,16 +70,17 @@ def extract_subject_theme(text: str, subject_title: str = None) -> Dict[str, str
             logger.warning(f"JSON decode error on attempt {attempt+1}: {str(e)}")
             if attempt == max_retries - 1:
                 logger.error(f"Failed to extract theme after {max_retries} attempts: {str(e)}")
+                discard_cached_completion(prompt)
                 return {
                     "core_topic": subject_title or "Unknown",
-                    "key_contents": "Extracted from title: " + (subject_title or "Unknown"),
+                    "key_contents": FALLBACK_THEME_PREFIX + (subject_title or "Unknown"),
                     "application_domain": "General Education"
                 }
             
 def extract_subjects_with_llm(text: str, subject_title: str = None) -> Dict[str, Dict]:
     prompt = get_extract_subjects_prompt(subject_title, text)
     try:
-        response = llm.invoke(prompt).strip()
+        response = invoke_llm(prompt, "extract_subjects").strip()
         subjects = safe_json_parse(response)
         if not isinstance(subjects, dict):
             raise ValueError("LLM response is not a dictionary")
@@ -89,4 +96,5 @@ def extract_subjects_with_llm(text: str, subject_title: str = None) -> Dict[str,
         }
     except Exception as e:
         logger.error(f"Error processing LLM response: {str(e)}")
+        discard_cached_completion(prompt)
         raise HTTPException(status_code=500, detail=f"Error processing response: {str(e)}")
\ No newline at end of file
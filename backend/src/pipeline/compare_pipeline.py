@@ -0,0 +1,350 @@
+import logging
+import difflib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Callable, Dict, List, Tuple
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from src.extractors.guide_extractor import extract_subjects_from_guide_generic
+from src.comparators.theme_comparator import compare_themes_cascade
+from src.comparators.content_comparator import similarity_score
+from src.utils.subject_utils import convert_to_new_format
+from src.database.database import Comparison
+from src.database.comparison_store import find_comparisons_by_url2, upsert_comparison
+from src.database.subject_store import find_subject_id
+from src.pipeline.subject_artifacts import SubjectArtifacts
+from src.pipeline.ingestion import load_ingested_subjects
+from src.llm.scheduler import bind_priority
+from src.search.subject_index import subject_index
+
+logger = logging.getLogger(__name__)
+
+THEME_SIMILARITY_THRESHOLD = 0.66
+
+_guide_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="guide")
+
+PipelineListener = Callable[[str, Dict], None]
+
+def _notify(listener: PipelineListener, event: str, **payload) -> None:
+    if listener is None:
+        return
+    try:
+        listener(event, payload)
+    except Exception as e:
+        logger.error(f"🔴 [PIPELINE] Error notificando evento '{event}': {str(e)}")
+
+def build_combined_text(title: str, subject_data: Dict) -> str:
+    return f"""
+            Nombre: {title}
+            Competencias: {subject_data.get('competences', '')}
+            Objetivos: {subject_data.get('objectives', '')}
+            Contenidos: {subject_data.get('contents', '')}
+        """
+
+def resolve_subject_details(artifacts: SubjectArtifacts, url: str, title: str, cutoff: float) -> Tuple[str, Dict]:
+    subjects = artifacts.details(url, title)
+    logger.debug(f"🔵 [PIPELINE] Respuesta LLM asignatura '{title}':\n{subjects}")
+    subjects = convert_to_new_format(subjects)
+
+    best_match = difflib.get_close_matches(title.upper(), [s.upper() for s in subjects.keys()], n=1, cutoff=cutoff)
+    if not best_match:
+        logger.error(f"🔴 [PIPELINE] No se encontró la asignatura '{title}'. Títulos extraídos: {list(subjects.keys())}")
+        raise HTTPException(status_code=400, detail=f"Asignatura '{title}' no encontrada. Títulos disponibles: {list(subjects.keys())}")
+
+    match_upper = best_match[0]
+    original_title = next((s for s in subjects.keys() if s.upper() == match_upper), match_upper)
+    return original_title, subjects[original_title]
+
+def index_compared_subjects(artifacts: SubjectArtifacts, subjects: List[Dict], guide_url: str = None) -> None:
+    try:
+        subject_index.add_subjects(artifacts.index_entries(subjects, guide_url))
+    except Exception as e:
+        logger.error(f"🔴 [PIPELINE] Error actualizando el índice de asignaturas: {str(e)}")
+
+def stored_guide_matches(db: Session, url1: str, subject_title: str, guide_url: str) -> List[Dict]:
+    existing_comparisons = db.query(Comparison).filter(
+        Comparison.url1 == url1,
+        Comparison.subject_title1 == subject_title,
+        Comparison.guide_url == guide_url,
+        Comparison.comparison_type == "compare"
+    ).all()
+    detailed_subjects = [
+        {
+            "asignatura": comp.subject_title2,
+            "similitud_tematica": comp.theme_similarity,
+            "similitud_contenido": comp.similarity_score,
+            "componentes": comp.components,
+            "analisis": comp.analysis,
+            "explicacion": comp.explanation,
+            "detalles": comp.detalles_comparada or {},
+            "url": comp.url2
+        }
+        for comp in existing_comparisons
+    ]
+    detailed_subjects.sort(key=lambda x: x["similitud_contenido"], reverse=True)
+    return detailed_subjects
+
+def save_guide_comparisons(db: Session, url1: str, source_title: str, subject_title: str, subject_data: Dict,
+                           guide_url: str, matches: List[Tuple[Dict, Dict]]) -> None:
+    """Upserts the new (candidate, match) results of a guide comparison in a single transaction."""
+    if not matches:
+        return
+    try:
+        subject1_id = find_subject_id(db, url1, source_title)
+        for subject, match in matches:
+            upsert_comparison(db, {
+                "comparison_type": "compare",
+                "url1": url1,
+                "subject_title1": subject_title,
+                "url2": subject['url'],
+                "subject_title2": match["asignatura"],
+                "guide_url": guide_url,
+                "similarity_score": match["similitud_contenido"],
+                "theme_similarity": match["similitud_tematica"],
+                "components": match["componentes"],
+                "analysis": match["analisis"],
+                "explanation": match["explicacion"],
+                "detalles_origen": subject_data,
+                "detalles_comparada": match["detalles"],
+                "subject1_id": subject1_id,
+                "subject2_id": find_subject_id(db, subject['url'], subject['name'])
+            })
+        db.commit()
+        logger.info(f"🟢 [PIPELINE] {len(matches)} comparaciones guardadas en una transacción")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"🔴 [PIPELINE] Error guardando comparaciones: {str(e)}")
+
+def run_guide_comparison(url1: str, subject_title: str, url2: str, db: Session, listener: PipelineListener = None,
+                         artifacts: SubjectArtifacts = None, guide_subjects: List[Dict] = None) -> Dict:
+    """Blocking /compare pipeline; meant to run on a worker thread, never on the event loop.
+
+    listener, when given, receives ("progress", {"phase", "done", "total"}) events as each phase advances,
+    a ("source", {...}) event once the source subject is resolved and a ("match", {...}) event per scored candidate.
+    artifacts and guide_subjects let several runs against the same guide share its crawl and extractions.
+    """
+    artifacts = artifacts or SubjectArtifacts()
+    source_title = subject_title
+    # La lista de asignaturas de la guía no depende de la asignatura origen: se descarga en paralelo
+    guide_future = None
+    if guide_subjects is None:
+        guide_subjects = load_ingested_subjects(url2, artifacts, db)
+    if guide_subjects is None:
+        guide_future = _guide_executor.submit(bind_priority(extract_subjects_from_guide_generic), url2, max_subjects=10)
+
+    # Fase inicial: Extraer detalles de la asignatura principal (siempre, ya que es rápida y necesaria)
+    logger.info("🔵 [PIPELINE] Extrayendo asignatura principal")
+    main_theme = artifacts.theme(url1, source_title)
+    logger.info(f"🔵 [PIPELINE] Temática principal identificada: {main_theme}")
+
+    subject_title, subject_data = resolve_subject_details(artifacts, url1, source_title, cutoff=0.4)
+    combined_text1 = build_combined_text(subject_title, subject_data)
+    _notify(listener, "source", asignatura_origen=subject_title, tema_principal=main_theme, detalles_origen=subject_data)
+
+    # Verificación inicial: Buscar comparaciones existentes para esta guía y asignatura origen
+    existing_matches = stored_guide_matches(db, url1, subject_title, url2)
+    if existing_matches:
+        logger.info(f"🟢 [PIPELINE] Comparaciones existentes encontradas para esta guía ({len(existing_matches)}), devolviendo resultados almacenados")
+        if guide_future:
+            guide_future.cancel()
+        for match in existing_matches[:5]:
+            _notify(listener, "match", **match)
+        return {
+            "asignatura_origen": subject_title,
+            "tema_principal": main_theme,
+            "detalles_origen": subject_data,
+            "coincidencias": existing_matches[:5]
+        }
+
+    # Si no existen, proceder con el flujo completo
+    logger.info("🔵 [PIPELINE] No se encontraron comparaciones existentes, procediendo con extracción completa")
+
+    logger.info("🔵 [PIPELINE] Fase 1: Extrayendo asignaturas básicas de la guía docente")
+    if guide_future:
+        guide_subjects = guide_future.result()
+    logger.info(f"🔵 [PIPELINE] Asignaturas encontradas en guía: {len(guide_subjects)}")
+    _notify(listener, "progress", phase="subjects_fetched", done=0, total=len(guide_subjects))
+
+    logger.info("🔵 [PIPELINE] Fase 2: Descargando asignaturas de la guía")
+    extracted_contents = artifacts.prefetch_raw_texts(
+        guide_subjects,
+        on_subject=lambda done: _notify(listener, "progress", phase="subjects_fetched", done=done, total=len(guide_subjects))
+    )
+    subjects_with_content = 0
+    for subject in guide_subjects:
+        if extracted_contents.get(subject["url"]):
+            subjects_with_content += 1
+            logger.info(f"✅ Contenido extraído para asignatura: {subject['name']}")
+        elif subject["url"] in extracted_contents:
+            logger.warning(f"⚠️ No se encontró contenido para asignatura: {subject['name']}")
+    logger.info(f"🔵 [PIPELINE] Asignaturas con contenido extraído: {subjects_with_content}")
+
+    logger.info("🔵 [PIPELINE] Fase 3: Comparando temáticas")
+    filtered_subjects = []
+    themed_subjects = []
+    cascade_stats: Dict[str, int] = {}
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        future_to_subject = {
+            executor.submit(bind_priority(artifacts.theme), subject['url'], subject['name']): subject
+            for subject in guide_subjects
+        }
+        # Se puntúa cada tanda de temas en cuanto está lista, mientras el resto se sigue extrayendo
+        pending_futures = set(future_to_subject)
+        while pending_futures:
+            done_futures, pending_futures = wait(pending_futures, return_when=FIRST_COMPLETED)
+            ready = []
+            for future in done_futures:
+                subject = future_to_subject[future]
+                try:
+                    ready.append((subject, future.result()))
+                except Exception as e:
+                    logger.error(f"🔴 [PIPELINE] Error extrayendo tema de {subject['name']}: {str(e)}")
+            themed_subjects.extend(ready)
+            _notify(listener, "progress", phase="themes_extracted", done=len(themed_subjects), total=len(guide_subjects))
+            if not ready:
+                continue
+
+            theme_similarities, batch_stats = compare_themes_cascade(
+                main_theme,
+                [subject_theme for _, subject_theme in ready],
+                subject_title,
+                [subject['name'] for subject, _ in ready],
+                threshold=THEME_SIMILARITY_THRESHOLD
+            )
+            for key, value in batch_stats.items():
+                cascade_stats[key] = cascade_stats.get(key, 0) + value
+            for (subject, subject_theme), theme_similarity in zip(ready, theme_similarities):
+                if theme_similarity is None:
+                    logger.info(f"🔵 [PIPELINE] Comparación temática: {subject['name']} - descartada sin consultar al LLM")
+                    continue
+                logger.info(f"🔵 [PIPELINE] Comparación temática: {subject['name']} - Similitud: {theme_similarity:.2f}")
+                if theme_similarity >= THEME_SIMILARITY_THRESHOLD:
+                    filtered_subjects.append({
+                        'name': subject['name'],
+                        'theme': subject_theme,
+                        'theme_similarity': theme_similarity,
+                        'url': subject['url']
+                    })
+    logger.info(f"🔵 [PIPELINE] Filtro en cascada: {cascade_stats}")
+
+    logger.info(f"🔵 [PIPELINE] Asignaturas relevantes encontradas: {len(filtered_subjects)}")
+    _notify(listener, "progress", phase="themes_compared", done=len(themed_subjects), total=len(themed_subjects))
+    _notify(listener, "progress", phase="details_analyzed", done=0, total=len(filtered_subjects))
+
+    logger.info("🔵 [PIPELINE] Fase 4: Reutilizando detalles de la asignatura principal")
+    logger.debug(f"🔵 [PIPELINE] Texto combinado asignatura principal:\n{combined_text1}")
+
+    logger.info("🔵 [PIPELINE] Fase 5: Procesando asignaturas relevantes")
+    detailed_subjects = []
+    stored_comparisons = find_comparisons_by_url2(db, "compare", url1, subject_title, [s['url'] for s in filtered_subjects])
+    analyzed = 0
+    for subject in filtered_subjects:
+        existing_comparison = stored_comparisons.get(subject['url'])
+        if not existing_comparison:
+            continue
+        logger.info(f"🟢 [PIPELINE] Comparación ya existe para {subject['name']}, devolviendo resultado almacenado")
+        detailed_subjects.append({
+            "asignatura": existing_comparison.subject_title2,
+            "similitud_tematica": subject['theme_similarity'],
+            "similitud_contenido": existing_comparison.similarity_score,
+            "componentes": existing_comparison.components,
+            "analisis": existing_comparison.analysis,
+            "explicacion": existing_comparison.explanation,
+            "detalles": existing_comparison.detalles_comparada or {},
+            "url": subject['url']
+        })
+        _notify(listener, "match", **detailed_subjects[-1])
+        analyzed += 1
+        _notify(listener, "progress", phase="details_analyzed", done=analyzed, total=len(filtered_subjects))
+
+    new_comparisons = []
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        future_to_analysis = {
+            executor.submit(bind_priority(artifacts.details), subject['url'], subject['name']): subject
+            for subject in filtered_subjects if subject['url'] not in stored_comparisons
+        }
+        for future in as_completed(future_to_analysis):
+            subject = future_to_analysis[future]
+            try:
+                subject_info = future.result()
+                logger.debug(f"🔵 [PIPELINE] Respuesta LLM asignatura relevante:\n{subject_info}")
+                if subject_info:
+                    subject_name, details = next(iter(subject_info.items()))
+                    combined_text2 = build_combined_text(subject_name, details)
+                    logger.debug(f"🔵 [PIPELINE] Texto combinado asignatura relevante:\n{combined_text2}")
+                    logger.info("🔵 [PIPELINE] Calculando similitud con embedding...")
+                    analysis = similarity_score(combined_text1, combined_text2)
+                    logger.info(f"🔵 [PIPELINE] Resultado análisis:\n{analysis}")
+                    detailed_subjects.append({
+                        "asignatura": subject_name,
+                        "similitud_tematica": subject['theme_similarity'],
+                        "similitud_contenido": analysis.get('score', 0) * 100,
+                        "componentes": analysis.get('components', {}),
+                        "analisis": analysis.get('llm_analysis', ''),
+                        "explicacion": analysis.get('explanation', ''),
+                        "detalles": details,
+                        "url": subject['url']
+                    })
+                    _notify(listener, "match", **detailed_subjects[-1])
+                    new_comparisons.append((subject, detailed_subjects[-1]))
+
+            except Exception as e:
+                logger.error(f"🔴 [PIPELINE] Error analizando asignatura: {str(e)}")
+            finally:
+                analyzed += 1
+                _notify(listener, "progress", phase="details_analyzed", done=analyzed, total=len(filtered_subjects))
+
+    save_guide_comparisons(db, url1, source_title, subject_title, subject_data, url2, new_comparisons)
+
+    detailed_subjects.sort(key=lambda x: x["similitud_contenido"], reverse=True)
+    index_compared_subjects(artifacts, [{"url": url1, "name": source_title}], None)
+    index_compared_subjects(artifacts, guide_subjects, url2)
+    logger.info("🟢 [PIPELINE] Comparación completada y guardada en la base de datos")
+    return {
+        "asignatura_origen": subject_title,
+        "tema_principal": main_theme,
+        "detalles_origen": subject_data,
+        "coincidencias": detailed_subjects[:5]
+    }
+
+def run_batch_guide_comparison(sources: List[Dict], url2: str, db: Session) -> Dict:
+    """Compares several source subjects against one guide, crawling and extracting the guide side only once."""
+    artifacts = SubjectArtifacts()
+    logger.info(f"🔵 [PIPELINE] Comparación por lotes: {len(sources)} asignaturas origen contra {url2}")
+    guide_subjects = load_ingested_subjects(url2, artifacts, db)
+    if guide_subjects is None:
+        guide_subjects = extract_subjects_from_guide_generic(url2, max_subjects=10)
+    logger.info(f"🔵 [PIPELINE] Asignaturas encontradas en guía: {len(guide_subjects)}")
+    artifacts.prefetch_raw_texts(guide_subjects)
+
+    results = []
+    for source in sources:
+        try:
+            results.append(run_guide_comparison(
+                source["url1"], source["subject_title"], url2, db,
+                artifacts=artifacts, guide_subjects=guide_subjects
+            ))
+        except HTTPException as he:
+            logger.error(f"🔴 [PIPELINE] Error en lote para {source['subject_title']}: {he.detail}")
+            results.append({"asignatura_origen": source["subject_title"], "url1": source["url1"], "error": he.detail})
+        except Exception as e:
+            logger.error(f"🔴 [PIPELINE] Error en lote para {source['subject_title']}: {str(e)}", exc_info=True)
+            results.append({"asignatura_origen": source["subject_title"], "url1": source["url1"], "error": str(e)})
+    return {"guia": url2, "asignaturas_guia": len(guide_subjects), "resultados": results}
+
+def run_subject_search(url1: str, subject_title: str, top_k: int) -> Dict:
+    artifacts = SubjectArtifacts()
+    main_theme = artifacts.theme(url1, subject_title)
+    details = convert_to_new_format(artifacts.details(url1, subject_title))
+    subject_data = next(iter(details.values()), {})
+    results = subject_index.search({
+        "core_topic": main_theme.get("core_topic", ""),
+        "key_contents": main_theme.get("key_contents", ""),
+        "contents": subject_data.get("contents", "")
+    }, top_k=top_k, exclude_url=url1)
+    index_compared_subjects(artifacts, [{"url": url1, "name": subject_title}], None)
+    return {
+        "asignatura_origen": subject_title,
+        "tema_principal": main_theme,
+        "detalles_origen": subject_data,
+        "resultados": results
+    }
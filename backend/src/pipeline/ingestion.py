@@ -0,0 +1,135 @@
+import argparse
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+from src.extractors.guide_extractor import extract_subjects_from_guide_generic
+from src.llm.client import llm
+from src.llm.subject_llm import is_fallback_theme
+from src.llm.scheduler import bind_priority, llm_priority
+from src.database.database import SessionLocal
+from src.database.subject_store import (
+    store_lock, get_subject, is_guide_subject, upsert_subject, stored_theme, save_theme, save_embeddings, load_embeddings,
+    ingested_guide_subjects, mark_guide_ingested
+)
+from src.pipeline.subject_artifacts import SubjectArtifacts
+from src.search.subject_index import subject_index
+from src.utils.embedding_utils import embedding_cache
+
+logger = logging.getLogger(__name__)
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+EMBEDDED_THEME_FIELDS = ("core_topic", "key_contents", "application_domain")
+
+def _is_ingested(db: Session, subject: Dict, guide_url: str) -> bool:
+    stored = get_subject(db, subject["url"], subject["name"])
+    return (
+        stored is not None and is_guide_subject(db, guide_url, stored)
+        and bool(stored.details) and stored_theme(db, stored, llm.model) is not None
+    )
+
+def _ingest_subject(artifacts: SubjectArtifacts, guide_url: str, subject: Dict) -> None:
+    raw_text = artifacts.raw_text(subject["url"], subject["name"])
+    if not raw_text.strip():
+        raise ValueError("No se encontró contenido")
+    theme = artifacts.theme(subject["url"], subject["name"])
+    details = artifacts.details(subject["url"], subject["name"])
+    if not theme or not details or is_fallback_theme(theme):
+        raise ValueError("La extracción con LLM no devolvió resultados")
+
+    fields = [field for field in EMBEDDED_THEME_FIELDS if str(theme.get(field) or "").strip()]
+    vectors = embedding_cache.embed_many([str(theme[field]) for field in fields]) if fields else []
+    with store_lock, SessionLocal() as db:
+        stored = upsert_subject(db, subject["url"], subject["name"], raw_text=raw_text, details=details, guide_url=guide_url)
+        save_theme(db, stored, llm.model, theme)
+        save_embeddings(db, stored, embedding_cache.model_name, {
+            field: (embedding_cache.key_for(str(theme[field])), vector) for field, vector in zip(fields, vectors)
+        })
+        db.commit()
+
+def ingest_guide(guide_url: str, workers: int = INGEST_WORKERS, restart: bool = False,
+                 listener: Callable[[str, Dict], None] = None) -> Dict:
+    """Extracts and stores raw text, theme and details for every subject of a guide, skipping subjects already stored."""
+    logger.info(f"🔵 [INGEST] Rastreando guía completa: {guide_url}")
+    subjects = extract_subjects_from_guide_generic(guide_url, max_subjects=0)
+
+    artifacts = SubjectArtifacts(persist=not restart)
+    pending, ingested = [], []
+    with SessionLocal() as db:
+        for subject in subjects:
+            if restart or not _is_ingested(db, subject, guide_url):
+                pending.append(subject)
+                continue
+            # Ya almacenada: se siembra para indexarla sin volver a extraerla
+            stored = get_subject(db, subject["url"], subject["name"])
+            artifacts.seed("theme", subject["url"], subject["name"], stored_theme(db, stored, llm.model))
+            artifacts.seed("details", subject["url"], subject["name"], stored.details)
+            ingested.append(subject)
+    skipped = len(ingested)
+    logger.info(f"🔵 [INGEST] {len(subjects)} asignaturas, {skipped} ya procesadas, {len(pending)} pendientes")
+    if listener:
+        listener("progress", {"phase": "subjects_ingested", "done": skipped, "total": len(subjects)})
+
+    done, failed = skipped, 0
+    with llm_priority("background"), ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(bind_priority(_ingest_subject), artifacts, guide_url, s): s for s in pending}
+        for future in as_completed(futures):
+            subject = futures[future]
+            try:
+                future.result()
+                ingested.append(subject)
+                done += 1
+                logger.info(f"✅ [INGEST] {subject['name']} procesada")
+            except Exception as e:
+                failed += 1
+                logger.error(f"🔴 [INGEST] Error procesando {subject['name']}: {str(e)}")
+            if listener:
+                listener("progress", {"phase": "subjects_ingested", "done": done, "total": len(subjects)})
+
+    # Las asignaturas ingeridas también se buscan con /search, no solo las que pasaron por un /compare en vivo
+    try:
+        with llm_priority("background"):
+            subject_index.add_subjects(artifacts.index_entries(ingested, guide_url))
+    except Exception as e:
+        logger.error(f"🔴 [INGEST] Error actualizando el índice de asignaturas: {str(e)}")
+
+    with store_lock, SessionLocal() as db:
+        mark_guide_ingested(db, guide_url, done, complete=failed == 0)
+        db.commit()
+    if failed:
+        # Mientras falten asignaturas, /compare sigue rastreando la guía en vivo en lugar de usar el almacén
+        logger.warning(f"⚠️ [INGEST] Guía {guide_url} incompleta ({failed} con error): se usará en vivo hasta que otra ejecución las complete")
+    logger.info(f"🟢 [INGEST] Guía {guide_url} ingerida: {done}/{len(subjects)} asignaturas, {failed} con error")
+    return {"guide_url": guide_url, "total": len(subjects), "done": done, "failed": failed, "skipped": skipped}
+
+def load_ingested_subjects(guide_url: str, artifacts: SubjectArtifacts, db: Session) -> Optional[List[Dict]]:
+    """Seeds artifacts (and the embedding cache) with an ingested guide's stored extractions; None if not ingested."""
+    stored_subjects = ingested_guide_subjects(db, guide_url)
+    if not stored_subjects:
+        return None
+    embeddings = load_embeddings(db, [s.id for s in stored_subjects], embedding_cache.model_name)
+    subjects = []
+    for stored in stored_subjects:
+        theme = stored_theme(db, stored, llm.model)
+        if not theme or not stored.details:
+            continue
+        artifacts.seed("raw_text", stored.url, stored.title, stored.raw_text)
+        artifacts.seed("theme", stored.url, stored.title, theme)
+        artifacts.seed("details", stored.url, stored.title, stored.details)
+        for field, (text_hash, vector) in embeddings.get(stored.id, {}).items():
+            text = str(theme.get(field) or "")
+            if embedding_cache.key_for(text) == text_hash:
+                embedding_cache.prime(text, vector)
+        subjects.append({"name": stored.title, "url": stored.url})
+    logger.info(f"🟢 [INGEST] Usando {len(subjects)} asignaturas precalculadas de {guide_url}")
+    return subjects or None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the subject artifacts of a whole course guide")
+    parser.add_argument("guide_url")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--restart", action="store_true", help="re-extract subjects that are already stored")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    print(ingest_guide(args.guide_url, workers=args.workers, restart=args.restart))
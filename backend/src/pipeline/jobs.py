@@ -0,0 +1,147 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+from fastapi import HTTPException
+from src.database.database import SessionLocal
+from src.llm.scheduler import PRIORITIES, llm_priority
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "20"))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", str(24 * 3600)))
+MAX_FINISHED_JOBS = 500
+
+class JobManager:
+    """Bounded queue of background pipeline runs processed by a fixed pool of worker threads."""
+
+    def __init__(self, workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE):
+        self._workers = workers
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=queue_size)
+        self._jobs: Dict[str, Dict] = {}
+        self._tasks: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _ensure_workers(self) -> None:
+        if self._threads:
+            return
+        for i in range(self._workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, kind: str, params: Dict, task: Callable, priority: str = "background") -> Dict:
+        """Queues task(db, listener), run with the given LLM priority, and returns the job record; raises 503 when the queue is full."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown LLM priority: {priority}")
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "params": params,
+            "priority": priority,
+            "status": "queued",
+            "progress": {},
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        with self._lock:
+            self._ensure_workers()
+            self._purge_finished()
+            self._jobs[job_id] = job
+            self._tasks[job_id] = task
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job_id]
+                del self._tasks[job_id]
+            logger.warning("⚠️ [JOBS] Cola de trabajos llena, rechazando petición")
+            raise HTTPException(status_code=503, detail="Demasiadas comparaciones en curso, inténtalo más tarde")
+        logger.info(f"🔵 [JOBS] Trabajo {job_id} ({kind}) encolado")
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+            snapshot["progress"] = {phase: dict(values) for phase, values in job["progress"].items()}
+            snapshot["queue_position"] = self._queue_position(job_id) if job["status"] == "queued" else None
+            return snapshot
+
+    def _queue_position(self, job_id: str) -> Optional[int]:
+        with self._queue.mutex:
+            pending = list(self._queue.queue)
+        return pending.index(job_id) + 1 if job_id in pending else None
+
+    def _update_progress(self, job_id: str, event: str, payload: Dict) -> None:
+        if event != "progress":
+            return
+        with self._lock:
+            self._jobs[job_id]["progress"][payload["phase"]] = {"done": payload["done"], "total": payload["total"]}
+
+    def _work(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                task = self._tasks.pop(job_id, None)
+                if job is None or task is None:
+                    self._queue.task_done()
+                    continue
+                job["status"] = "running"
+                job["started_at"] = time.time()
+
+            db = SessionLocal()
+            try:
+                with llm_priority(job["priority"]):
+                    result = task(db, lambda event, payload: self._update_progress(job_id, event, payload))
+                with self._lock:
+                    job["result"] = result
+                    job["status"] = "completed"
+                logger.info(f"🟢 [JOBS] Trabajo {job_id} completado")
+            except HTTPException as he:
+                with self._lock:
+                    job["error"] = he.detail
+                    job["status"] = "failed"
+                logger.error(f"🔴 [JOBS] Trabajo {job_id} fallido: {he.detail}")
+            except Exception as e:
+                with self._lock:
+                    job["error"] = str(e)
+                    job["status"] = "failed"
+                logger.error(f"🔴 [JOBS] Trabajo {job_id} fallido: {str(e)}", exc_info=True)
+            finally:
+                db.close()
+                with self._lock:
+                    job["finished_at"] = time.time()
+                self._queue.task_done()
+
+    def _purge_finished(self) -> None:
+        now = time.time()
+        finished = sorted(
+            (job for job in self._jobs.values() if job["finished_at"] is not None),
+            key=lambda job: job["finished_at"]
+        )
+        overflow = len(finished) - MAX_FINISHED_JOBS
+        for i, job in enumerate(finished):
+            if i < overflow or now - job["finished_at"] > JOB_RESULT_TTL:
+                del self._jobs[job["job_id"]]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            by_status = {}
+            for job in self._jobs.values():
+                by_status[job["status"]] = by_status.get(job["status"], 0) + 1
+        return {"workers": self._workers, "queue_size": self._queue.maxsize, "queued": self._queue.qsize(), "by_status": by_status}
+
+job_manager = JobManager()
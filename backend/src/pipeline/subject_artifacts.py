@@ -0,0 +1,141 @@
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple, Any
+from src.extractors.subject_extractor import extract_subject_from_url, subject_page_urls
+from src.llm.subject_llm import extract_subject_theme, extract_subjects_with_llm, is_fallback_theme
+from src.utils.url_utils import fetch_many
+from src.utils.subject_utils import convert_to_new_format
+from src.llm.client import llm
+from src.database.database import SessionLocal
+from src.database.subject_store import store_lock, content_hash, get_subject, upsert_subject, stored_theme, save_theme
+
+logger = logging.getLogger(__name__)
+
+class SubjectArtifacts:
+    """Request-scoped memo of the raw text, theme and structured details of each (url, title).
+
+    Themes and details are also persisted per subject and content hash, so they are extracted once across requests.
+    """
+
+    def __init__(self, persist: bool = True):
+        self.persist = persist
+        self._lock = threading.Lock()
+        self._memo: Dict[Tuple[str, str, str], Future] = {}
+
+    def _get_or_compute(self, kind: str, url: str, title: str, compute: Callable[[], Any]) -> Any:
+        key = (kind, url, title)
+        with self._lock:
+            future = self._memo.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._memo[key] = future
+        if owner:
+            try:
+                future.set_result(compute())
+            except BaseException as e:
+                future.set_exception(e)
+        else:
+            logger.debug(f"♻️ Reusing {kind} for {title} ({url})")
+        return future.result()
+
+    def seed(self, kind: str, url: str, title: str, value: Any) -> None:
+        """Registers an already computed artifact (e.g. loaded from the guide store)."""
+        future = Future()
+        future.set_result(value)
+        with self._lock:
+            self._memo.setdefault((kind, url, title), future)
+
+    def raw_text(self, url: str, title: str) -> str:
+        return self._get_or_compute("raw_text", url, title, lambda: extract_subject_from_url(url, title))
+
+    def theme(self, url: str, title: str) -> Dict[str, str]:
+        return self._get_or_compute("theme", url, title, lambda: self._stored_or_extract("theme", url, title))
+
+    def details(self, url: str, title: str) -> Dict[str, Dict]:
+        return self._get_or_compute("details", url, title, lambda: self._stored_or_extract("details", url, title))
+
+    def _stored_or_extract(self, kind: str, url: str, title: str) -> Any:
+        raw_text = self.raw_text(url, title)
+        persist = self.persist and bool(raw_text.strip())
+        if persist:
+            stored = self._load_stored(kind, url, title, raw_text)
+            if stored:
+                logger.debug(f"💾 Using stored {kind} for {title} ({url})")
+                return stored
+
+        if kind == "theme":
+            value = extract_subject_theme(raw_text)
+        else:
+            value = extract_subjects_with_llm(raw_text, subject_title=title)
+        if kind == "theme" and value and is_fallback_theme(value):
+            logger.warning(f"⚠️ Tema de {title} generado a partir del título, no se guarda")
+            return value
+        if persist and value:
+            self._save(kind, url, title, raw_text, value)
+        return value
+
+    def _load_stored(self, kind: str, url: str, title: str, raw_text: str) -> Optional[Any]:
+        # Solo lectura: sin store_lock ni commit; lo que falte se escribe en _save tras extraerlo
+        try:
+            with SessionLocal() as db:
+                subject = get_subject(db, url, title)
+                if subject is None or subject.content_hash != content_hash(raw_text):
+                    return None
+                if kind == "details":
+                    return subject.details
+                theme = stored_theme(db, subject, llm.model)
+                return None if theme and is_fallback_theme(theme) else theme
+        except Exception as e:
+            logger.error(f"❌ Error leyendo {kind} almacenado de {title}: {e}")
+            return None
+
+    def _save(self, kind: str, url: str, title: str, raw_text: str, value: Any) -> None:
+        try:
+            with store_lock, SessionLocal() as db:
+                subject = upsert_subject(db, url, title, raw_text=raw_text, details=value if kind == "details" else None)
+                if kind == "theme":
+                    save_theme(db, subject, llm.model, value)
+                db.commit()
+        except Exception as e:
+            logger.error(f"❌ Error guardando {kind} de {title}: {e}")
+
+    def prefetch_raw_texts(self, subjects: List[Dict], on_subject: Callable[[int], None] = None) -> Dict[str, str]:
+        fetch_many([
+            url for subject in subjects if self.peek("raw_text", subject["url"], subject["name"]) is None
+            for url in subject_page_urls(subject["url"])
+        ])
+        contents = {}
+        for done, subject in enumerate(subjects, start=1):
+            try:
+                contents[subject["url"]] = self.raw_text(subject["url"], subject["name"])
+            except Exception as e:
+                logger.error(f"❌ Error al procesar asignatura {subject['name']}: {e}")
+            if on_subject:
+                on_subject(done)
+        return contents
+
+    def peek(self, kind: str, url: str, title: str) -> Optional[Any]:
+        with self._lock:
+            future = self._memo.get((kind, url, title))
+        if future is None or not future.done() or future.exception() is not None:
+            return None
+        return future.result()
+
+    def index_entries(self, subjects: List[Dict], guide_url: str = None) -> List[Dict]:
+        entries = []
+        for subject in subjects:
+            theme = self.peek("theme", subject["url"], subject["name"])
+            if not theme:
+                continue
+            details = convert_to_new_format(self.peek("details", subject["url"], subject["name"]) or {})
+            entries.append({
+                "url": subject["url"],
+                "title": subject["name"],
+                "guide_url": guide_url,
+                "core_topic": theme.get("core_topic", ""),
+                "key_contents": theme.get("key_contents", ""),
+                "contents": next(iter(details.values()), {}).get("contents", ""),
+            })
+        return entries
@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from src.utils.disk_cache import CACHE_DIR
+from src.utils.embedding_utils import embedding_cache
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = os.path.join(CACHE_DIR, "subject_index")
+INDEX_FIELDS = {"core_topic": 0.4, "key_contents": 0.4, "contents": 0.2}
+
+class SubjectIndex:
+    """Local vector index over every extracted subject, one row-normalized matrix per field."""
+
+    def __init__(self, directory: str = INDEX_DIR, use_float16_memmap: bool = False):
+        self.directory = directory
+        self.use_float16_memmap = use_float16_memmap
+        self._lock = threading.Lock()
+        self._entries: List[Dict] = []
+        self._positions: Dict[tuple, int] = {}
+        self._matrices: Dict[str, Optional[np.ndarray]] = {field: None for field in INDEX_FIELDS}
+        self._loaded = False
+
+    @property
+    def _dtype(self):
+        return np.float16 if self.use_float16_memmap else np.float32
+
+    def _matrix_path(self, field: str) -> str:
+        return os.path.join(self.directory, f"{field}.npy")
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        meta_path = os.path.join(self.directory, "entries.json")
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, encoding="utf-8") as f:
+            self._entries = json.load(f)
+        self._positions = {(e["url"], e["title"]): i for i, e in enumerate(self._entries)}
+        for field in INDEX_FIELDS:
+            path = self._matrix_path(field)
+            if os.path.exists(path):
+                self._matrices[field] = np.load(path, mmap_mode="r" if self.use_float16_memmap else None)
+        logger.info(f"📚 Subject index loaded with {len(self._entries)} subjects")
+
+    def _save(self, updated: Dict[str, tuple] = None) -> None:
+        """Writes the index once per batch; when no rows were appended, updated rows are patched into the .npy files in place."""
+        os.makedirs(self.directory, exist_ok=True)
+        for field, matrix in self._matrices.items():
+            if matrix is None:
+                continue
+            path = self._matrix_path(field)
+            if updated is not None and os.path.exists(path):
+                positions, rows = updated.get(field, ([], None))
+                if positions:
+                    on_disk = np.lib.format.open_memmap(path, mode="r+")
+                    on_disk[positions] = rows.astype(on_disk.dtype)
+                    on_disk.flush()
+                    del on_disk
+                continue
+            tmp_path = path + ".tmp.npy"
+            np.save(tmp_path, np.asarray(matrix, dtype=self._dtype))
+            os.replace(tmp_path, path)
+        meta_path = os.path.join(self.directory, "entries.json")
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(meta_path + ".tmp", meta_path)
+        if self.use_float16_memmap:
+            for field in INDEX_FIELDS:
+                if self._matrices[field] is not None:
+                    self._matrices[field] = np.load(self._matrix_path(field), mmap_mode="r")
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    def add_subjects(self, subjects: List[Dict]) -> int:
+        """Upserts subjects given as dicts with url, title, guide_url and the INDEX_FIELDS texts."""
+        if not subjects:
+            return 0
+        embedded = {}
+        for field in INDEX_FIELDS:
+            texts = [str(s.get(field) or "") for s in subjects]
+            valid = [i for i, text in enumerate(texts) if text.strip()]
+            embedded[field] = (valid, embedding_cache.embed_many([texts[i] for i in valid]) if valid else None)
+        dim = next((vectors.shape[1] for _, vectors in embedded.values() if vectors is not None), None)
+        if dim is None:
+            logger.warning("⚠️ No indexable text for the given subjects, skipping")
+            return 0
+        field_rows = {}
+        for field, (valid, vectors) in embedded.items():
+            matrix = np.zeros((len(subjects), dim), dtype=np.float32)
+            if vectors is not None:
+                matrix[valid] = self._normalize(vectors.astype(np.float32))
+            field_rows[field] = matrix
+
+        with self._lock:
+            self._load()
+            new_indices, updated_positions, updated_indices = [], [], []
+            for i, subject in enumerate(subjects):
+                entry = {
+                    "url": subject["url"],
+                    "title": subject["title"],
+                    "guide_url": subject.get("guide_url"),
+                    "core_topic": subject.get("core_topic", ""),
+                }
+                key = (entry["url"], entry["title"])
+                position = self._positions.get(key)
+                if position is None:
+                    self._positions[key] = len(self._entries)
+                    self._entries.append(entry)
+                    new_indices.append(i)
+                else:
+                    self._entries[position] = entry
+                    updated_positions.append(position)
+                    updated_indices.append(i)
+
+            # Una sola copia/escritura por campo y lote, no una por asignatura actualizada
+            updated = {}
+            for field in INDEX_FIELDS:
+                matrix = self._matrices[field]
+                rows = field_rows[field][updated_indices]
+                if new_indices:
+                    current = np.asarray(matrix, dtype=np.float32) if matrix is not None else np.zeros((0, dim), dtype=np.float32)
+                    matrix = np.vstack([current, field_rows[field][new_indices]])
+                    matrix[updated_positions] = rows
+                    self._matrices[field] = matrix
+                elif updated_positions:
+                    # Las matrices en memmap (solo lectura) se actualizan directamente en el fichero
+                    if not isinstance(matrix, np.memmap):
+                        matrix[updated_positions] = rows
+                    updated[field] = (updated_positions, rows)
+            self._save(None if new_indices else updated)
+            logger.info(f"📚 Subject index now holds {len(self._entries)} subjects")
+        return len(subjects)
+
+    def search(self, query: Dict[str, str], top_k: int = 10, exclude_url: str = None) -> List[Dict]:
+        query_vectors = {
+            field: self._normalize(embedding_cache.embed(str(query[field])).astype(np.float32)[None, :])[0]
+            for field in INDEX_FIELDS if str(query.get(field) or "").strip()
+        }
+        with self._lock:
+            self._load()
+            if not self._entries:
+                return []
+            scores = np.zeros(len(self._entries), dtype=np.float32)
+            field_scores = {}
+            for field, query_vector in query_vectors.items():
+                matrix = self._matrices[field]
+                if matrix is None:
+                    continue
+                field_scores[field] = np.asarray(matrix @ query_vector.astype(matrix.dtype), dtype=np.float32)
+                scores += INDEX_FIELDS[field] * field_scores[field]
+            entries = list(self._entries)
+
+        if exclude_url:
+            scores = np.where([e["url"] == exclude_url for e in entries], -np.inf, scores)
+        k = min(top_k, len(entries))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                **entries[i],
+                "score": round(float(scores[i]), 4),
+                "field_scores": {field: round(float(values[i]), 4) for field, values in field_scores.items()},
+            }
+            for i in top if np.isfinite(scores[i])
+        ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._entries)
+
+subject_index = SubjectIndex(use_float16_memmap=os.getenv("SUBJECT_INDEX_MEMMAP", "0") == "1")
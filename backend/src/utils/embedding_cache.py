@@ -0,0 +1,107 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from src.utils.disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MEMORY_ITEMS = 4096
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+class EmbeddingCache:
+    """Content-addressed embedding store: in-memory LRU in front of a persistent DiskCache.
+
+    mode names how embed_fn/embed_batch_fn embed a text (e.g. "query" vs "passage" instructions); it is part of the
+    key, and both callables must produce the same kind of vector for a given text.
+    """
+
+    def __init__(self, model_name: str, embed_fn: Callable[[str], List[float]],
+                 embed_batch_fn: Callable[[List[str]], List[List[float]]] = None, max_items: int = EMBEDDING_MEMORY_ITEMS,
+                 mode: str = "query"):
+        self.model_name = model_name
+        self.mode = mode
+        self._embed_fn = embed_fn
+        self._embed_batch_fn = embed_batch_fn
+        self._max_items = max_items
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = DiskCache("embeddings")
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def key_for(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{self.mode}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._max_items:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return vector
+
+        stored = self._disk.get(key)
+        if stored is None:
+            return None
+        vector = np.frombuffer(stored, dtype=np.float32)
+        with self._lock:
+            self._stats["disk_hits"] += 1
+        self._remember(key, vector)
+        return vector
+
+    def _store(self, key: str, embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        self._disk.set(key, vector.tobytes())
+        with self._lock:
+            self._stats["misses"] += 1
+        self._remember(key, vector)
+        return vector
+
+    def prime(self, text: str, vector: np.ndarray) -> None:
+        """Puts an embedding computed elsewhere (e.g. stored alongside a subject) into the in-memory layer."""
+        self._remember(self.key_for(text), np.asarray(vector, dtype=np.float32))
+
+    def embed(self, text: str) -> np.ndarray:
+        key = self.key_for(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self._store(key, self._embed_fn(normalize_text(text)))
+        return vector
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        keys = [self.key_for(text) for text in texts]
+        vectors = [self._lookup(key) for key in keys]
+        missing = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(keys[i], []).append(i)
+        if missing:
+            pending_texts = [normalize_text(texts[indices[0]]) for indices in missing.values()]
+            if self._embed_batch_fn:
+                embeddings = self._embed_batch_fn(pending_texts)
+            else:
+                embeddings = [self._embed_fn(text) for text in pending_texts]
+            for (key, indices), embedding in zip(missing.items(), embeddings):
+                vector = self._store(key, embedding)
+                for i in indices:
+                    vectors[i] = vector
+        return np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_items"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
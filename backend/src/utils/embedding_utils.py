@@ -1,10 +1,26 @@
+import functools
 import logging
 import time
+from typing import List
+import numpy as np
 from langchain_community.embeddings import OllamaEmbeddings
-from sklearn.metrics.pairwise import cosine_similarity
+from src.utils.embedding_cache import EmbeddingCache
+from src.llm.scheduler import llm_scheduler
 
 embedding_model = OllamaEmbeddings(model="nomic-embed-text")
 
+def embed_queries(texts: List[str]) -> List[List[float]]:
+    # Mismo embed_query que para un solo texto: embed_documents usa otra instrucción y daría otro vector.
+    # Una ranura del scheduler por texto: un lote largo no retiene la capacidad ni adelanta a las llamadas interactivas
+    return [llm_scheduler.run("embedding", embedding_model.embed_query, text) for text in texts]
+
+embedding_cache = EmbeddingCache(
+    embedding_model.model,
+    functools.partial(llm_scheduler.run, "embedding", embedding_model.embed_query),
+    embed_queries,
+    mode="query"
+)
+
 def compute_embedding_similarity(text1: str, text2: str, logger: logging.Logger, adjust: bool = True) -> float:
     try:
         if not text1.strip() or not text2.strip():
@@ -12,20 +28,37 @@ def compute_embedding_similarity(text1: str, text2: str, logger: logging.Logger,
             return 0.0
 
         logger.debug(f"Computing similarity for texts:\nT1: {text1[:100]}...\nT2: {text2[:100]}...")
+        return compute_embedding_similarities_batch(text1, [text2], logger, adjust=adjust)[0]
+    except Exception as e:
+        logger.error(f"Error in compute_embedding_similarity: {str(e)}")
+        return 0.0
+
+def compute_embedding_similarities_batch(query: str, candidates: List[str], logger: logging.Logger, adjust: bool = True) -> List[float]:
+    scores = np.zeros(len(candidates), dtype=np.float64)
+    try:
+        if not query.strip():
+            logger.warning("Query text is empty, returning 0 for every candidate")
+            return scores.tolist()
+        valid = [i for i, text in enumerate(candidates) if text and text.strip()]
+        if not valid:
+            return scores.tolist()
+
         start_time = time.time()
-        emb1 = embedding_model.embed_query(text1)
-        emb2 = embedding_model.embed_query(text2)
-        raw_similarity = cosine_similarity([emb1], [emb2])[0][0]
-        
+        query_vector = embedding_cache.embed(query).astype(np.float64)
+        candidate_matrix = embedding_cache.embed_many([candidates[i] for i in valid]).astype(np.float64)
+        norms = np.linalg.norm(candidate_matrix, axis=1) * np.linalg.norm(query_vector)
+        raw_similarity = np.divide(candidate_matrix @ query_vector, norms, out=np.zeros(len(valid)), where=norms > 0)
+
         adjusted_similarity = raw_similarity
         if adjust:
-            adjusted_similarity = max(0, raw_similarity - 0.1)
-            len_ratio = min(len(text1), len(text2)) / max(len(text1), len(text2))
-            if len_ratio < 0.6:
-                adjusted_similarity *= 0.8
-        
-        logger.debug(f"Similarity calculated: {adjusted_similarity} (raw: {raw_similarity}) (in {time.time()-start_time:.2f}s)")
-        return adjusted_similarity
+            lengths = np.array([len(candidates[i]) for i in valid], dtype=np.float64)
+            len_ratio = np.minimum(lengths, len(query)) / np.maximum(lengths, len(query))
+            adjusted_similarity = np.maximum(0, raw_similarity - 0.1)
+            adjusted_similarity = np.where(len_ratio < 0.6, adjusted_similarity * 0.8, adjusted_similarity)
+
+        scores[valid] = adjusted_similarity
+        logger.debug(f"Batch similarity for {len(valid)} candidates calculated in {time.time()-start_time:.2f}s")
+        return scores.tolist()
     except Exception as e:
-        logger.error(f"Error in compute_embedding_similarity: {str(e)}")
-        return 0.0
\ No newline at end of file
+        logger.error(f"Error in compute_embedding_similarities_batch: {str(e)}")
+        return np.zeros(len(candidates)).tolist()
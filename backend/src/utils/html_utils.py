@@ -1,10 +1,67 @@
+import importlib.util
 import logging
-from bs4 import BeautifulSoup
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+from bs4.element import CData, NavigableString
 
 logger = logging.getLogger(__name__)
 
+# lxml (C) es bastante más rápido que html.parser; si no está instalado se usa el parser de la stdlib
+HTML_PARSER = os.getenv("HTML_PARSER") or ("lxml" if importlib.util.find_spec("lxml") else "html.parser")
+PARSED_PAGES_MAX_ITEMS = 64
+SKIPPED_TAGS = ["script", "style", "nav", "footer", "header", "aside"]
+
+_parsed_pages: "OrderedDict[tuple, BeautifulSoup]" = OrderedDict()
+_parsed_lock = threading.Lock()
+
+def parse_html(markup: str, only: Iterable[str] = None) -> BeautifulSoup:
+    """Parses markup with the fastest available backend; only, when given, keeps just those tags and their subtrees."""
+    parse_only = SoupStrainer(list(only)) if only else None
+    return BeautifulSoup(markup, HTML_PARSER, parse_only=parse_only)
+
+def parse_page(url: str, content: str, only: Tuple[str, ...] = None) -> BeautifulSoup:
+    """Parses a fetched page once and shares the (read-only) tree between every extractor that asks for it."""
+    key = (url, only, len(content), hash(content))
+    with _parsed_lock:
+        soup = _parsed_pages.get(key)
+        if soup is not None:
+            _parsed_pages.move_to_end(key)
+            return soup
+    soup = parse_html(content, only)
+    with _parsed_lock:
+        _parsed_pages[key] = soup
+        while len(_parsed_pages) > PARSED_PAGES_MAX_ITEMS:
+            _parsed_pages.popitem(last=False)
+    return soup
+
+def _inside_skipped(string: NavigableString, root: Tag) -> bool:
+    parent = string.parent
+    while parent is not None and parent is not root:
+        if parent.name in SKIPPED_TAGS:
+            return True
+        parent = parent.parent
+    return False
+
+def node_text(node: Tag, limit: Optional[int] = 500) -> str:
+    """Visible text of a node without re-serializing or re-parsing it, skipping script/style/navigation blocks."""
+    if node.name in SKIPPED_TAGS:
+        return ""
+    if node.find(SKIPPED_TAGS) is None:
+        return node.get_text(separator=" ", strip=True)[:limit]
+    parts = []
+    for string in node.find_all(string=True):
+        if type(string) not in (NavigableString, CData) or not string.strip():
+            continue
+        if _inside_skipped(string, node):
+            continue
+        parts.append(string.strip())
+    return " ".join(parts)[:limit]
+
 def clean_html(html: str) -> str:
-    soup = BeautifulSoup(html, "html.parser")
-    for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
+    soup = parse_html(html)
+    for tag in soup(SKIPPED_TAGS):
         tag.decompose()
-    return soup.get_text(separator=" ", strip=True)[:500]
\ No newline at end of file
+    return soup.get_text(separator=" ", strip=True)[:500]
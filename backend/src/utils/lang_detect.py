@@ -1,29 +1,41 @@
-from langdetect import detect
-from src.llm.client import llm
+from langdetect import DetectorFactory, detect
 import logging
-from src.llm.prompts import translate_text_to_english
+import os
+from src.utils.translation import translator
 
 logger = logging.getLogger(__name__)
 
-def ensure_english(text: str) -> str:
-    """Traduce el texto a inglés usando LLM si no lo está."""
-    if not text or not text.strip():
+# langdetect es aleatorio por defecto: con semilla fija el mismo texto da siempre el mismo idioma (y la misma clave de caché)
+DetectorFactory.seed = 0
+DETECT_SAMPLE_CHARS = int(os.getenv("DETECT_SAMPLE_CHARS", "2000"))
+
+def language_sample(text: str, max_chars: int = DETECT_SAMPLE_CHARS) -> str:
+    """Beginning of the text, cut at a word boundary; enough for langdetect and bounded for long guides."""
+    if len(text) <= max_chars:
         return text
-    
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
+
+def detect_language(text: str) -> str:
     try:
-        lang = detect(text)
-        logger.info(f"🌐 Detectado idioma: {lang}")
-        logger.info(f"📥 Texto original ({lang}):\n{text[:500]}...")
+        return detect(language_sample(text)).lower()
     except Exception as e:
         logger.info(f"⚠️ No se pudo detectar idioma, se asume inglés: {e}")
-        lang = "en"
+        return "en"
+
+def ensure_english(text: str) -> str:
+    """Traduce el texto a inglés (motor local si lo hay, LLM si no) si no lo está."""
+    if not text or not text.strip():
+        return text
+
+    lang = detect_language(text)
+    logger.info(f"🌐 Detectado idioma: {lang}")
+    logger.info(f"📥 Texto original ({lang}):\n{text[:500]}...")
 
-    if lang.lower() != "en":
-        logger.info("🌐 Traduciendo texto a inglés con LLM...")
-        prompt = translate_text_to_english(text)
-        translated = llm.invoke(prompt).strip()
+    if lang != "en":
+        translated = translator.translate(text, lang)
         logger.info(f"📤 Texto traducido (en):\n{translated[:500]}...")
         return translated
     
     logger.info(f"✅ Texto ya en inglés:\n{text[:500]}...")
-    return text
\ No newline at end of file
+    return text
@@ -0,0 +1,190 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from src.utils.disk_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", os.path.join(CACHE_DIR, "pages"))
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", str(7 * 24 * 3600)))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)), doseq=True)
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+@dataclass
+class CachedPage:
+    key: str
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_type: Optional[str]
+    encoding: Optional[str]
+    size: int
+    fetched_at: float
+    path: str
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def read_text(self) -> str:
+        return self.read_bytes().decode(self.encoding or "utf-8", errors="replace")
+
+
+class PageCache:
+    def __init__(self, directory: str = PAGE_CACHE_DIR, ttl: int = PAGE_CACHE_TTL, max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stats = {"hits": 0, "misses": 0, "revalidated": 0, "stale_served": 0, "stored": 0, "evicted": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite"), check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_type TEXT,
+                    encoding TEXT,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_pages_accessed_at ON pages (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.body")
+
+    def lookup(self, url: str) -> Optional[CachedPage]:
+        key = self.key_for(url)
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT url, etag, last_modified, content_type, encoding, size, fetched_at FROM pages WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if not row:
+                return None
+            path = self._body_path(key)
+            if not os.path.exists(path):
+                conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+        return CachedPage(key, row[0], row[1], row[2], row[3], row[4], row[5], row[6], path)
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return time.time() - page.fetched_at < self.ttl
+
+    def conditional_headers(self, page: CachedPage) -> Dict[str, str]:
+        headers = {}
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    def store(self, url: str, content: bytes, headers: Mapping[str, str], encoding: Optional[str]) -> CachedPage:
+        key = self.key_for(url)
+        path = self._body_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        page = CachedPage(
+            key, normalize_url(url), headers.get("ETag"), headers.get("Last-Modified"),
+            headers.get("Content-Type"), encoding, len(content), now, path
+        )
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (key, url, etag, last_modified, content_type, encoding, size, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, page.url, page.etag, page.last_modified, page.content_type, encoding, page.size, now, now)
+            )
+            conn.commit()
+            self._stats["stored"] += 1
+            self._evict()
+        return page
+
+    def refresh(self, page: CachedPage, headers: Mapping[str, str]) -> None:
+        page.etag = headers.get("ETag") or page.etag
+        page.last_modified = headers.get("Last-Modified") or page.last_modified
+        page.fetched_at = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE pages SET etag = ?, last_modified = ?, fetched_at = ?, accessed_at = ? WHERE key = ?",
+                (page.etag, page.last_modified, page.fetched_at, page.fetched_at, page.key)
+            )
+            conn.commit()
+
+    def _evict(self) -> None:
+        conn = self._connection()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM pages ORDER BY accessed_at ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._body_path(key))
+            except FileNotFoundError:
+                pass
+            conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            total -= size
+            self._stats["evicted"] += 1
+        conn.commit()
+        logger.info(f"🧹 Page cache evicted entries, current size: {total} bytes")
+
+    def record(self, event: str) -> None:
+        with self._lock:
+            self._stats[event] += 1
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+            row = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        lookups = stats["hits"] + stats["revalidated"] + stats["misses"]
+        stats["entries"] = row[0]
+        stats["size_bytes"] = row[1]
+        stats["hit_rate"] = round((stats["hits"] + stats["revalidated"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+page_cache = PageCache()
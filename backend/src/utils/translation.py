@@ -0,0 +1,128 @@
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from src.llm.client import invoke_llm
+from src.llm.prompts import translate_text_to_english
+from src.llm.scheduler import bind_priority
+from src.utils.disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+# argostranslate es opcional: si no está instalado (o no tiene el paquete del idioma) se traduce con el LLM
+ARGOS_ENABLED = os.getenv("ARGOS_TRANSLATE", "1") == "1" and importlib.util.find_spec("argostranslate") is not None
+TRANSLATION_CHUNK_CHARS = int(os.getenv("TRANSLATION_CHUNK_CHARS", "1500"))
+TRANSLATION_TTL = 90 * 24 * 3600
+LLM_TRANSLATION_WORKERS = 2
+
+SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?;:])\s+")
+
+def split_chunks(text: str, max_chars: int = TRANSLATION_CHUNK_CHARS) -> List[str]:
+    """Splits text into chunks of at most max_chars, on line boundaries first and on sentences for longer lines."""
+    pieces = []
+    for line in text.split("\n"):
+        if len(line) <= max_chars:
+            pieces.append(line)
+            continue
+        for sentence in SENTENCE_END_PATTERN.split(line):
+            pieces.extend(sentence[start:start + max_chars] for start in range(0, len(sentence), max_chars))
+
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n{piece}" if current else piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+class Translator:
+    """Translates to English chunk by chunk: offline argostranslate first, LLM fallback.
+
+    argostranslate results are cached here by content hash; LLM chunks are cached once, by the LLM completion cache.
+    """
+
+    def __init__(self, chunk_chars: int = TRANSLATION_CHUNK_CHARS):
+        self.chunk_chars = chunk_chars
+        self._disk = DiskCache("translations")
+        self._argos: Dict[str, object] = {}
+        # _models_lock serializa la carga de modelos; _lock solo protege los contadores
+        self._models_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats = {"chunks": 0, "cached": 0, "argos": 0, "llm": 0}
+
+    @staticmethod
+    def key_for(source: str, chunk: str) -> str:
+        return hashlib.sha256(f"{source}\x00en\x00{chunk}".encode("utf-8")).hexdigest()
+
+    def _record(self, event: str, count: int = 1) -> None:
+        with self._lock:
+            self._stats[event] += count
+
+    def _argos_translation(self, source: str):
+        if not ARGOS_ENABLED:
+            return None
+        with self._models_lock:
+            if source not in self._argos:
+                # Solo paquetes ya instalados: nunca se descarga nada en tiempo de petición
+                import argostranslate.translate
+                languages = {language.code: language for language in argostranslate.translate.get_installed_languages()}
+                translation = None
+                if source in languages and "en" in languages:
+                    translation = languages[source].get_translation(languages["en"])
+                if translation is None:
+                    logger.info(f"⚠️ Sin paquete argostranslate {source}→en, se usará el LLM")
+                self._argos[source] = translation
+            return self._argos[source]
+
+    def _translate_with_llm(self, chunk: str) -> str:
+        return invoke_llm(translate_text_to_english(chunk), "translate").strip()
+
+    def translate(self, text: str, source: str) -> str:
+        chunks = split_chunks(text, self.chunk_chars)
+        # Los fragmentos repetidos (p. ej. competencias comunes) se traducen una sola vez
+        unique_chunks = list(dict.fromkeys(chunks))
+        translated: Dict[str, Optional[str]] = {chunk: self._disk.get(self.key_for(source, chunk)) for chunk in unique_chunks}
+        pending = [chunk for chunk in unique_chunks if translated[chunk] is None]
+        self._record("chunks", len(unique_chunks))
+        self._record("cached", len(unique_chunks) - len(pending))
+
+        argos = self._argos_translation(source) if pending else None
+        argos_chunks = []
+        if argos is not None:
+            for chunk in pending:
+                try:
+                    translated[chunk] = argos.translate(chunk)
+                    argos_chunks.append(chunk)
+                    self._record("argos")
+                except Exception as e:
+                    logger.warning(f"⚠️ argostranslate falló en un fragmento, se usará el LLM: {e}")
+
+        llm_pending = [chunk for chunk in pending if translated[chunk] is None]
+        if llm_pending:
+            logger.info(f"🌐 Traduciendo {len(llm_pending)}/{len(unique_chunks)} fragmentos a inglés con LLM...")
+            with ThreadPoolExecutor(max_workers=LLM_TRANSLATION_WORKERS) as executor:
+                for chunk, value in zip(llm_pending, executor.map(bind_priority(self._translate_with_llm), llm_pending)):
+                    translated[chunk] = value
+            self._record("llm", len(llm_pending))
+
+        # Las traducciones del LLM ya quedan en la caché de completions: aquí solo se guardan las de argostranslate
+        for chunk in argos_chunks:
+            if translated[chunk]:
+                self._disk.set(self.key_for(source, chunk), translated[chunk], ttl=TRANSLATION_TTL)
+        return "\n".join(translated[chunk] for chunk in chunks if translated[chunk])
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["argos_available"] = ARGOS_ENABLED
+        stats["disk"] = self._disk.get_stats()
+        return stats
+
+translator = Translator()
@@ -1,20 +1,134 @@
+import asyncio
 import logging
-from typing import Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
 from fastapi import HTTPException
 import requests
-from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode, urlparse
 from io import BytesIO
 import fitz
+from src.utils.page_cache import CachedPage, page_cache
 
 logger = logging.getLogger(__name__)
 
+HOST_CONCURRENCY = {"urv.cat": 4, "cvut.cz": 4, "udl.cat": 3}
+DEFAULT_HOST_CONCURRENCY = 4
+MAX_FETCH_WORKERS = 16
+PDF_MAGIC = b"%PDF-"
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=MAX_FETCH_WORKERS)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+_fetch_executor = ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS, thread_name_prefix="fetch")
+_host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_host_semaphores_lock = threading.Lock()
+
+def _host_semaphore(url: str) -> threading.BoundedSemaphore:
+    host = (urlparse(url).hostname or "").lower()
+    key, limit = host, DEFAULT_HOST_CONCURRENCY
+    for domain, domain_limit in HOST_CONCURRENCY.items():
+        if host == domain or host.endswith("." + domain):
+            key, limit = domain, domain_limit
+            break
+    with _host_semaphores_lock:
+        if key not in _host_semaphores:
+            _host_semaphores[key] = threading.BoundedSemaphore(limit)
+        return _host_semaphores[key]
+
 def build_urv_url(base_url: str, params: Dict[str, str], fitxa_apartat: str) -> str:
     cleaned_params = {k: v[-1] for k, v in params.items() if k != 'fitxa_apartat'}
     cleaned_params['fitxa_apartat'] = fitxa_apartat
     return f"{base_url.split('?')[0]}?{urlencode(cleaned_params, doseq=True)}"
 
-def fetch_url_content(url: str, headers: Dict[str, str] = None) -> str:
-    headers = headers or {"User-Agent": "Mozilla/5.0"}
-    response = requests.get(url, headers=headers, timeout=10)
-    response.raise_for_status()
-    return response.text
\ No newline at end of file
+def _is_pdf(content_type: Optional[str], head: bytes) -> bool:
+    return "pdf" in (content_type or "").lower() or head.startswith(PDF_MAGIC)
+
+def _fetch(url: str, headers: Optional[Dict[str, str]], use_cache: bool) -> Tuple[Optional[CachedPage], Optional[requests.Response]]:
+    """Returns the cached page when it can be served from cache, otherwise the fresh response (and its cache entry)."""
+    headers = dict(headers or {"User-Agent": "Mozilla/5.0"})
+    cached = page_cache.lookup(url) if use_cache else None
+    if cached and page_cache.is_fresh(cached):
+        page_cache.record("hits")
+        logger.debug(f"💾 Page cache hit: {url}")
+        return cached, None
+
+    if cached:
+        headers.update(page_cache.conditional_headers(cached))
+
+    try:
+        with _host_semaphore(url):
+            response = _session.get(url, headers=headers, timeout=10)
+        if cached and response.status_code == 304:
+            page_cache.refresh(cached, response.headers)
+            page_cache.record("revalidated")
+            logger.debug(f"💾 Page cache revalidated (304): {url}")
+            return cached, None
+        response.raise_for_status()
+    except requests.RequestException as e:
+        if cached:
+            page_cache.record("stale_served")
+            logger.warning(f"⚠️ Fetch failed for {url}, serving stale cached copy: {e}")
+            return cached, None
+        raise
+
+    if _is_pdf(response.headers.get("Content-Type"), response.content[:len(PDF_MAGIC)]):
+        # Un PDF no es texto: se evita la detección de charset sobre todo el binario
+        response.encoding = "utf-8"
+    stored = None
+    if use_cache:
+        page_cache.record("misses")
+        stored = page_cache.store(url, response.content, response.headers, response.encoding or response.apparent_encoding)
+    return stored, response
+
+def fetch_url_content(url: str, headers: Dict[str, str] = None, use_cache: bool = True) -> str:
+    cached, response = _fetch(url, headers, use_cache)
+    return response.text if response is not None else cached.read_text()
+
+def fetch_document(url: str, headers: Dict[str, str] = None, use_cache: bool = True) -> Union[str, fitz.Document]:
+    """Like fetch_url_content, but PDF responses are returned as an open fitz.Document whose pages are decoded on demand."""
+    cached, response = _fetch(url, headers, use_cache)
+    if response is None:
+        with open(cached.path, "rb") as f:
+            head = f.read(len(PDF_MAGIC))
+        if not _is_pdf(cached.content_type, head):
+            return cached.read_text()
+        # Abierto desde el fichero de la caché: MuPDF lee del disco solo los objetos de las páginas que se cargan
+        logger.debug(f"📄 PDF servido desde la caché: {url}")
+        return fitz.open(cached.path, filetype="pdf")
+    if not _is_pdf(response.headers.get("Content-Type"), response.content[:len(PDF_MAGIC)]):
+        return response.text
+    if cached is not None:
+        return fitz.open(cached.path, filetype="pdf")
+    return fitz.open(stream=BytesIO(response.content), filetype="pdf")
+
+def fetch_many(urls: List[str], headers: Dict[str, str] = None) -> Dict[str, Optional[str]]:
+    unique_urls = list(dict.fromkeys(urls))
+    futures = {url: _fetch_executor.submit(fetch_url_content, url, headers) for url in unique_urls}
+    results = {}
+    for url, future in futures.items():
+        try:
+            results[url] = future.result()
+        except Exception as e:
+            logger.error(f"⚠️ Error fetching {url}: {e}")
+            results[url] = None
+    return results
+
+async def afetch_url_content(url: str, headers: Dict[str, str] = None) -> str:
+    """fetch_url_content for async callers: runs on the shared pooled executor, never on the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_fetch_executor, fetch_url_content, url, headers)
+
+async def afetch_many(urls: List[str], headers: Dict[str, str] = None) -> Dict[str, Optional[str]]:
+    unique_urls = list(dict.fromkeys(urls))
+    responses = await asyncio.gather(*(afetch_url_content(url, headers) for url in unique_urls), return_exceptions=True)
+    results = {}
+    for url, response in zip(unique_urls, responses):
+        if isinstance(response, Exception):
+            logger.error(f"⚠️ Error fetching {url}: {response}")
+            results[url] = None
+        else:
+            results[url] = response
+    return results
@@ -0,0 +1,37 @@
+import random
+from pathlib import Path
+import pytest
+from bs4 import BeautifulSoup
+from src.extractors.urv_extractor import extract_urv_contents
+from src.utils.html_utils import HTML_PARSER
+from urv_legacy import legacy_extract_urv_contents
+from urv_tables import random_page, nested_page
+
+FIXTURE = Path(__file__).parent / "fixtures" / "urv_fitxa.html"
+PARSERS = sorted({"html.parser", HTML_PARSER})
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_fixture_matches_legacy(parser):
+    soup = BeautifulSoup(FIXTURE.read_text(encoding="utf-8"), parser)
+    result = extract_urv_contents(soup)
+    assert result == legacy_extract_urv_contents(soup)
+    assert "TOPIC: 3. Graphs\nSUBTOPICS: 3.1 Traversals, 3.2 Shortest paths, 3.3 Minimum spanning trees" in result["contents"]
+    assert result["objectives"].startswith("A1.1\nAnalyses the cost of algorithms")
+    assert result["competences"] == (
+        "CB2 Apply knowledge to work in a professional way High\n"
+        "CE12 Design efficient algorithms and data structures Medium"
+    )
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_random_layouts_match_legacy(parser):
+    rng = random.Random(1234)
+    for _ in range(500):
+        soup = BeautifulSoup(random_page(rng), parser)
+        assert extract_urv_contents(soup) == legacy_extract_urv_contents(soup)
+
+def test_nested_layout_matches_legacy():
+    soup = BeautifulSoup(nested_page(random.Random(9), 40), "html.parser")
+    assert extract_urv_contents(soup) == legacy_extract_urv_contents(soup)
+
+def test_no_tables_returns_none():
+    assert extract_urv_contents(BeautifulSoup("<p>Sense taules</p>", "html.parser")) is None
@@ -0,0 +1,33 @@
+"""Random URV-like table layouts (nested tables, Verdana/header classes, tooltips, codes) for equivalence tests and benchmarks."""
+import random
+
+WORDS = ["Topic", "Sub-topic", "tema", "subtema", "Learning outcomes", "Competences", "Type", "CB1", "RA12",
+         "Intro to graphs", "ALGEBRA, I", "foo bar baz", "x"]
+CLASSES = [None, "Verdana", "VerdanaBlanca mainfons", "Verdana other", "VerdanaBlanca  mainfons", "mainfons VerdanaBlanca"]
+
+def _cell(rng: random.Random, depth: int) -> str:
+    cls = rng.choice(CLASSES)
+    attr = f' class="{cls}"' if cls else ''
+    r = rng.random()
+    if r < 0.15 and depth < 2:
+        inner = random_table(rng, depth + 1)
+    elif r < 0.3:
+        inner = f'<a class="Ntooltip2">{rng.choice(WORDS)}</a><br>{rng.choice(WORDS)}'
+    elif r < 0.4:
+        inner = f'{rng.choice(WORDS)}<br>{rng.choice(WORDS)}<br> '
+    else:
+        inner = rng.choice(WORDS)
+    return f'<td{attr}>{inner}</td>'
+
+def random_table(rng: random.Random, depth: int = 0) -> str:
+    rows = (''.join(_cell(rng, depth) for _ in range(rng.randint(0, 4))) for _ in range(rng.randint(1, 7)))
+    return '<table>' + ''.join(f'<tr>{row}</tr>' for row in rows) + '</table>'
+
+def random_page(rng: random.Random, tables: int = None) -> str:
+    count = tables if tables is not None else rng.randint(1, 4)
+    return '<html><body>' + ''.join(random_table(rng) for _ in range(count)) + '</body></html>'
+
+def nested_page(rng: random.Random, tables: int) -> str:
+    """Old-style layout: every block table nested inside a single outer layout table."""
+    inner = ''.join(random_table(rng, 1) for _ in range(tables))
+    return f'<html><body><table><tr><td>{inner}</td></tr></table></body></html>'
@@ -12,7 +12,7 @@ function App() {
   const [comparisonMode, setComparisonMode] = useState('compare');
   const [error, setError] = useState('');
   const {
-    url1, setUrl1, url2, setUrl2, subject, setSubject, subjectTitle1, setSubjectTitle1, subjectTitle2, setSubjectTitle2, isLoading, expandedResult, setExpandedResult, history, setHistory, handleCompare, fetchHistory, sourceDetails, results
+    url1, setUrl1, url2, setUrl2, subject, setSubject, subjectTitle1, setSubjectTitle1, subjectTitle2, setSubjectTitle2, isLoading, expandedResult, setExpandedResult, history, setHistory, historyCursor, loadMoreHistory, handleCompare, fetchHistory, sourceDetails, results
   } = useComparison({ setError, comparisonMode });
 
   return (
@@ -45,6 +45,8 @@ function App() {
           history={history}
           setHistory={setHistory}
           fetchHistory={fetchHistory}
+          hasMoreHistory={Boolean(historyCursor)}
+          loadMoreHistory={loadMoreHistory}
           setError={setError}
         />
       )}
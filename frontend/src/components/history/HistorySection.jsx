@@ -1,9 +1,23 @@
 import { useState } from 'react';
 import ConfirmModal from './ConfirmModal';
-import { clearComparisonHistory } from '../../services/api.js';
+import { clearComparisonHistory, fetchComparisonDetails } from '../../services/api.js';
 
-const HistorySection = ({ history, setHistory, fetchHistory, setError }) => {
+const HistorySection = ({ history, setHistory, fetchHistory, hasMoreHistory, loadMoreHistory, setError }) => {
   const [showConfirmModal, setShowConfirmModal] = useState(false);
+  const [details, setDetails] = useState({});
+
+  const toggleDetails = async (comparisonId) => {
+    if (details[comparisonId]) {
+      setDetails(({ [comparisonId]: _, ...rest }) => rest);
+      return;
+    }
+    try {
+      const comparison = await fetchComparisonDetails(comparisonId);
+      setDetails((previous) => ({ ...previous, [comparisonId]: comparison }));
+    } catch (err) {
+      setError(err);
+    }
+  };
 
   const handleClearHistoryClick = () => {
     setShowConfirmModal(true);
@@ -13,6 +27,8 @@ const HistorySection = ({ history, setHistory, fetchHistory, setError }) => {
     try {
       await clearComparisonHistory();
       setHistory([]);
+      setDetails({});
+      fetchHistory();
       setError('');
     } catch (err) {
       setError(err.response?.data?.detail || 'Error al esborrar l\'historial');
@@ -39,8 +55,8 @@ const HistorySection = ({ history, setHistory, fetchHistory, setError }) => {
         <p>No hi ha comparacions a l'historial.</p>
       ) : (
         <div className="history-grid">
-          {history.map((item, index) => (
-            <div key={index} className="history-card">
+          {history.map((item) => (
+            <div key={item.id} className="history-card">
               <div className="history-header">
                 <span className="history-date">{new Date(item.created_at).toLocaleString()}</span>
                 <span className="history-type">
@@ -65,17 +81,29 @@ const HistorySection = ({ history, setHistory, fetchHistory, setError }) => {
                 <p>
                   <strong>Similitut:</strong> {item.similarity_score?.toFixed(1)}%
                 </p>
-                <p><strong>Components:</strong></p>
-                <ul>
-                  <li>Continguts: {(item.components?.contents * 100)?.toFixed(1)}%</li>
-                  <li>Objectius: {(item.components?.objectives * 100)?.toFixed(1)}%</li>
-                  <li>Competències: {(item.components?.competences * 100)?.toFixed(1)}%</li>
-                </ul>
+                <button className="details-button" onClick={() => toggleDetails(item.id)}>
+                  {details[item.id] ? 'Amagar components' : 'Veure components'}
+                </button>
+                {details[item.id] && (
+                  <>
+                    <p><strong>Components:</strong></p>
+                    <ul>
+                      <li>Continguts: {(details[item.id].components?.contents * 100)?.toFixed(1)}%</li>
+                      <li>Objectius: {(details[item.id].components?.objectives * 100)?.toFixed(1)}%</li>
+                      <li>Competències: {(details[item.id].components?.competences * 100)?.toFixed(1)}%</li>
+                    </ul>
+                  </>
+                )}
               </div>
             </div>
           ))}
         </div>
       )}
+      {hasMoreHistory && (
+        <button className="load-more-button" onClick={loadMoreHistory}>
+          Carregar més
+        </button>
+      )}
       {showConfirmModal && (
         <ConfirmModal
           onConfirm={confirmClearHistory}
@@ -1,6 +1,9 @@
 import { useState, useEffect } from 'react';
 import axios from 'axios';
 
+const JOB_POLL_INTERVAL_MS = 2000;
+const HISTORY_PAGE_SIZE = 20;
+
 const useComparison = ({ setError, comparisonMode }) => {
   const [url1, setUrl1] = useState('');
   const [url2, setUrl2] = useState('');
@@ -12,20 +15,44 @@ const useComparison = ({ setError, comparisonMode }) => {
   const [isLoading, setIsLoading] = useState(false);
   const [expandedResult, setExpandedResult] = useState(null);
   const [history, setHistory] = useState([]);
+  const [historyCursor, setHistoryCursor] = useState(null);
 
-  const fetchHistory = async () => {
+  const fetchHistory = async (cursor = null) => {
     try {
-      const response = await axios.get('http://localhost:8000/comparison-history');
-      setHistory(response.data);
+      const response = await axios.get('http://localhost:8000/comparison-history', {
+        params: { limit: HISTORY_PAGE_SIZE, ...(cursor ? { cursor } : {}) },
+      });
+      setHistory((previous) => (cursor ? [...previous, ...response.data.items] : response.data.items));
+      setHistoryCursor(response.data.next_cursor);
     } catch (err) {
       setError(err.response?.data?.detail || 'Error al carregar l\'historial');
     }
   };
 
+  const loadMoreHistory = () => {
+    if (historyCursor) {
+      fetchHistory(historyCursor);
+    }
+  };
+
   useEffect(() => {
     fetchHistory();
   }, []);
 
+  const runCompareJob = async (payload) => {
+    const { data: job } = await axios.post('http://localhost:8000/compare-jobs', payload);
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+      const { data: status } = await axios.get(`http://localhost:8000/compare-jobs/${job.job_id}`);
+      if (status.status === 'completed') {
+        return { data: status.result };
+      }
+      if (status.status === 'failed') {
+        throw new Error(status.error || 'Error al processar la comparació');
+      }
+    }
+  };
+
   const handleCompare = async () => {
     if (comparisonMode === 'history') {
       fetchHistory();
@@ -53,7 +80,7 @@ const useComparison = ({ setError, comparisonMode }) => {
     try {
       let response;
       if (comparisonMode === 'compare') {
-        response = await axios.post('http://localhost:8000/compare', {
+        response = await runCompareJob({
           url1,
           url2,
           subject_title: subject,
@@ -208,7 +235,7 @@ const useComparison = ({ setError, comparisonMode }) => {
   };
 
   return {
-    url1, setUrl1, url2, setUrl2, subject, setSubject, subjectTitle1, setSubjectTitle1, subjectTitle2, setSubjectTitle2, results, setResults, sourceDetails, setSourceDetails, isLoading, expandedResult, setExpandedResult, history, setHistory, handleCompare, fetchHistory,
+    url1, setUrl1, url2, setUrl2, subject, setSubject, subjectTitle1, setSubjectTitle1, subjectTitle2, setSubjectTitle2, results, setResults, sourceDetails, setSourceDetails, isLoading, expandedResult, setExpandedResult, history, setHistory, historyCursor, loadMoreHistory, handleCompare, fetchHistory,
   };
 };
 
@@ -22,15 +22,24 @@ export const compareIndividualSubjects = async (data) => {
   }
 };
 
-export const fetchComparisonHistory = async () => {
+export const fetchComparisonHistory = async (params = {}) => {
   try {
-    const response = await api.get('/comparison-history');
+    const response = await api.get('/comparison-history', { params });
     return response.data;
   } catch (error) {
     throw error.response?.data?.detail || 'Error al carregar l\'historial';
   }
 };
 
+export const fetchComparisonDetails = async (comparisonId) => {
+  try {
+    const response = await api.get(`/comparison-history/${comparisonId}`);
+    return response.data;
+  } catch (error) {
+    throw error.response?.data?.detail || 'Error al carregar la comparació';
+  }
+};
+
 export const clearComparisonHistory = async () => {
   try {
     const response = await api.delete('/clear-history');